@@ -0,0 +1,160 @@
+# bot/api/booking.py
+import logging
+import sys
+from datetime import date
+from enum import IntEnum
+from typing import Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Статусы Lite PMS (status_id), при которых бронь действует
+ACTIVE_STATUS_IDS = ("2", "6", "8")
+
+
+class BookingStatus(IntEnum):
+    """Состояние брони — всё, что обработчики проверяют по status_id."""
+    INACTIVE = 0
+    ACTIVE = 1
+
+    @classmethod
+    def from_status_id(cls, status_id: str) -> "BookingStatus":
+        return cls.ACTIVE if status_id in ACTIVE_STATUS_IDS else cls.INACTIVE
+
+
+def _minutes(value: str) -> int:
+    """'2025-09-26 14:30:00' -> минуты от начала суток (0, если времени нет)."""
+    try:
+        return int(value[11:13]) * 60 + int(value[14:16])
+    except (TypeError, ValueError):
+        return 0
+
+
+def _int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def format_time(minutes: int) -> str:
+    """Минуты от начала суток -> 'HH:MM'."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class Booking:
+    """
+    Бронь из searchBooking, разобранная один раз при загрузке.
+    Даты заезда и выезда — date, время — минуты от начала суток, гости — одно число.
+    ID номера и статуса, фамилии и имена интернированы: одинаковые строки тысяч броней
+    хранятся в памяти один раз. Объекты общие для кэша и хранилища — изменять их нельзя.
+    """
+
+    __slots__ = (
+        "id", "room_id", "status_id", "status",
+        "day_in", "day_out", "time_in", "time_out",
+        "surname", "name", "guests",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        room_id: str,
+        status_id: str,
+        day_in: date,
+        day_out: date,
+        time_in: int = 0,
+        time_out: int = 0,
+        surname: str = "",
+        name: str = "",
+        guests: int = 1,
+    ):
+        self.id = id
+        self.room_id = sys.intern(room_id)
+        self.status_id = sys.intern(status_id)
+        self.status = BookingStatus.from_status_id(status_id)
+        self.day_in = day_in
+        self.day_out = day_out
+        self.time_in = time_in
+        self.time_out = time_out
+        self.surname = sys.intern(surname)
+        self.name = sys.intern(name)
+        self.guests = guests
+
+    @classmethod
+    def from_api(cls, data: dict) -> "Booking":
+        """
+        Разбирает запись searchBooking.
+        :raises ValueError: Если дата заезда или выезда отсутствует или некорректна.
+        """
+        date_in, date_out = str(data.get("date_in") or ""), str(data.get("date_out") or "")
+        return cls(
+            id=str(data.get("id") or ""),
+            room_id=str(data.get("room_id", "")),
+            status_id=str(data.get("status_id", "")),
+            day_in=date.fromisoformat(date_in[:10]),
+            day_out=date.fromisoformat(date_out[:10]),
+            time_in=_minutes(date_in),
+            time_out=_minutes(date_out),
+            surname=str(data.get("client_surname") or "").strip(),
+            name=str(data.get("client_name") or "").strip(),
+            guests=max(0, _int(data.get("person"), 1)) + max(0, _int(data.get("person_add"), 0)),
+        )
+
+    def to_api(self) -> dict:
+        """Запись в формате searchBooking (для снимка на диске), которую from_api разберёт обратно."""
+        return {
+            "id": self.id,
+            "room_id": self.room_id,
+            "status_id": self.status_id,
+            "date_in": self.date_in,
+            "date_out": self.date_out,
+            "client_surname": self.surname,
+            "client_name": self.name,
+            "person": str(self.guests),
+            "person_add": "0",
+        }
+
+    @property
+    def active(self) -> bool:
+        return self.status is BookingStatus.ACTIVE
+
+    @property
+    def key(self) -> str:
+        """Стабильный ключ брони (ID из Lite PMS или номер+дата заезда)."""
+        return self.id or f"{self.room_id}:{self.date_in}"
+
+    @property
+    def date_in(self) -> str:
+        """Заезд в формате Lite PMS: 'YYYY-MM-DD HH:MM:00'."""
+        return f"{self.day_in.isoformat()} {format_time(self.time_in)}:00"
+
+    @property
+    def date_out(self) -> str:
+        return f"{self.day_out.isoformat()} {format_time(self.time_out)}:00"
+
+    def _fields(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Booking):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Booking(id={self.id!r}, room_id={self.room_id!r}, {self.date_in}..{self.date_out}, {self.status.name})"
+
+
+def parse_bookings(records: Iterable[dict]) -> List[Booking]:
+    """Разбирает записи searchBooking; записи с некорректными датами пропускаются."""
+    bookings = []
+    skipped = 0
+    for record in records:
+        try:
+            bookings.append(Booking.from_api(record))
+        except (AttributeError, ValueError):
+            skipped += 1
+    if skipped:
+        logger.warning(f"⚠️ Пропущено броней с некорректными датами: {skipped}.")
+    return bookings
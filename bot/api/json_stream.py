@@ -0,0 +1,122 @@
+# bot/api/json_stream.py
+import codecs
+import json
+import logging
+from typing import Any, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+# Предел буфера для одного элемента массива: защищает от неограниченного роста памяти
+MAX_ITEM_SIZE = 4 * 1024 * 1024
+
+_WHITESPACE = " \t\r\n"
+# Символы, которыми может продолжаться число: '2.' из '2.5', '1e' из '1e5', '1' из '10'
+_NUMBER_CHARS = ".eE+-0123456789"
+
+
+class ArrayNotFoundError(ValueError):
+    """В ответе нет ключа с массивом: например, {"status": "error", "data": "текст ошибки"}."""
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes], key: str = "data") -> AsyncIterator[Any]:
+    """
+    Потоково разбирает JSON-объект вида {..., "<key>": [ {...}, {...} ], ...}
+    и отдаёт элементы массива по одному, не держа в памяти весь ответ.
+    :param chunks: Асинхронный поток байтов (например, resp.content.iter_chunked(...)).
+    :param key: Ключ верхнего уровня, содержащий массив.
+    :raises ArrayNotFoundError: Если ключа нет или его значение не массив (например, текст ошибки),
+                                чтобы ответ с ошибкой не выглядел как пустой список.
+    :raises ValueError: Если ответ оборвался внутри массива или элемент слишком велик.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+
+    # --- Фаза 1: поиск массива по ключу верхнего уровня ---
+    depth = 0
+    in_string = False
+    escape = False
+    string_chars: list = []
+    last_string = None  # последняя строка на первом уровне (кандидат в ключи)
+    value_key = None    # ключ, значение которого начинается сейчас
+    in_array = False
+
+    async for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+        if not in_array:
+            while pos < len(buf):
+                c = buf[pos]
+                pos += 1
+                if in_string:
+                    if escape:
+                        escape = False
+                    elif c == "\\":
+                        escape = True
+                    elif c == '"':
+                        in_string = False
+                        if depth == 1:
+                            last_string = "".join(string_chars)
+                        continue
+                    if depth == 1:
+                        string_chars.append(c)
+                elif c in _WHITESPACE:
+                    continue
+                elif c == '"':
+                    if depth == 1 and value_key == key:
+                        raise ArrayNotFoundError(f"Значение ключа '{key}' в ответе не является массивом")
+                    in_string = True
+                    string_chars = []
+                    value_key = None
+                elif c == ":" and depth == 1 and last_string is not None:
+                    value_key = last_string
+                    last_string = None
+                elif c == "[" and depth == 1 and value_key == key:
+                    in_array = True
+                    break
+                elif c in "{[":
+                    depth += 1
+                    value_key = None
+                elif c in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        raise ArrayNotFoundError(f"В ответе нет ключа '{key}'")
+                else:
+                    if depth == 1 and value_key == key:
+                        raise ArrayNotFoundError(f"Значение ключа '{key}' в ответе не является массивом")
+                    last_string = None
+                    value_key = None
+            if not in_array:
+                # Всё прочитанное разобрано, хранить его не нужно
+                buf = ""
+                pos = 0
+                continue
+
+        # --- Фаза 2: элементы массива по одному ---
+        while True:
+            while pos < len(buf) and (buf[pos] in _WHITESPACE or buf[pos] == ","):
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # Число или литерал на границе фрагмента может быть обрезано: raw_decode разберёт
+                # '2.' как 2, поэтому отдаём его, только когда после него пришёл разделитель
+                complete = buf[pos] in '{["' or (end < len(buf) and buf[end] not in _NUMBER_CHARS)
+            except json.JSONDecodeError:
+                complete = False
+            if not complete:
+                # Элемент пришёл не полностью — ждём следующий фрагмент
+                if len(buf) - pos > MAX_ITEM_SIZE:
+                    raise ValueError(f"Элемент массива '{key}' превышает {MAX_ITEM_SIZE} байт")
+                break
+            pos = end
+            yield item
+
+    if in_array:
+        raise ValueError(f"Ответ оборвался внутри массива '{key}'")
+    raise ArrayNotFoundError(f"В ответе нет ключа '{key}'")
@@ -1,32 +1,184 @@
 # bot/api/litepms.py
+import asyncio
 import aiohttp
 import logging
-from datetime import date, datetime
-from typing import Dict, List, Union, Any, Optional
+import time
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Union, Any, Optional, Tuple
 
-from bot.config import BASE_URL, LITEPMS_LOGIN, LITEPMS_API_KEY, SPA_ROOM_ID, DOPY_INCOME_ID
+from bot.config import (
+    BASE_URL, LITEPMS_LOGIN, LITEPMS_API_KEY, SPA_ROOM_ID, DOPY_INCOME_ID,
+    LITEPMS_RETRY_ATTEMPTS, LITEPMS_RETRY_BASE_DELAY, LITEPMS_RETRY_MAX_DELAY,
+    LITEPMS_BREAKER_FAILURES, LITEPMS_BREAKER_RESET,
+    LITEPMS_RATE_LIMIT, LITEPMS_RATE_BURST, LITEPMS_RATE_LIMITS,
+    LITEPMS_POOL_LIMIT, LITEPMS_POOL_LIMIT_PER_HOST, LITEPMS_KEEPALIVE_TIMEOUT,
+    LITEPMS_DNS_TTL, LITEPMS_CONNECT_TIMEOUT, LITEPMS_READ_TIMEOUT,
+    CLEANING_BULK_CONCURRENCY, RANGE_CHUNK_DAYS, RANGE_FETCH_CONCURRENCY,
+)
+from bot.api.resilience import CircuitBreaker, TokenBucket, backoff_delay
+from bot.api.json_stream import ArrayNotFoundError, iter_json_array
+from bot.api.booking import Booking, parse_bookings
+from bot import events
+from bot.utils.metrics import Counter, Gauge, Histogram
 
 logger = logging.getLogger(__name__)
 
 # --- Глобальная сессия для переиспользования соединений ---
 _http_session: Optional[aiohttp.ClientSession] = None
 
+# Статистика пула: ожидание свободного соединения, новые и переиспользованные соединения
+_pool_stats: Dict[str, float] = {
+    "queued": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+    "created": 0,
+    "reused": 0,
+}
+
+def _build_trace_config() -> aiohttp.TraceConfig:
+    """Собирает трассировку соединений для статистики пула."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_queued_start(session, ctx, params):
+        ctx.queued_at = asyncio.get_running_loop().time()
+
+    async def on_queued_end(session, ctx, params):
+        waited = asyncio.get_running_loop().time() - getattr(ctx, "queued_at", 0.0)
+        _pool_stats["queued"] += 1
+        _pool_stats["wait_total"] += waited
+        _pool_stats["wait_max"] = max(_pool_stats["wait_max"], waited)
+
+    async def on_create_end(session, ctx, params):
+        _pool_stats["created"] += 1
+
+    async def on_reuse(session, ctx, params):
+        _pool_stats["reused"] += 1
+
+    trace_config.on_connection_queued_start.append(on_queued_start)
+    trace_config.on_connection_queued_end.append(on_queued_end)
+    trace_config.on_connection_create_end.append(on_create_end)
+    trace_config.on_connection_reuseconn.append(on_reuse)
+    return trace_config
+
+async def open_session() -> aiohttp.ClientSession:
+    """Создаёт глобальную сессию с настроенным пулом соединений и таймаутами."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        return _http_session
+
+    connector = aiohttp.TCPConnector(
+        limit=LITEPMS_POOL_LIMIT,
+        limit_per_host=LITEPMS_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=LITEPMS_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=LITEPMS_DNS_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(
+        connect=LITEPMS_CONNECT_TIMEOUT,
+        sock_read=LITEPMS_READ_TIMEOUT,
+    )
+    _http_session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        trace_configs=[_build_trace_config()],
+    )
+    logger.info(
+        f"🌐 Пул соединений Lite PMS открыт: limit={LITEPMS_POOL_LIMIT}, "
+        f"per_host={LITEPMS_POOL_LIMIT_PER_HOST}, keepalive={LITEPMS_KEEPALIVE_TIMEOUT} с."
+    )
+    return _http_session
+
 async def get_session() -> aiohttp.ClientSession:
     """Возвращает глобальную aiohttp.ClientSession, создавая её при первом вызове."""
-    global _http_session
     if _http_session is None or _http_session.closed:
-        _http_session = aiohttp.ClientSession()
-        logger.debug("🌐 Создана новая aiohttp.ClientSession")
+        return await open_session()
     return _http_session
 
-# --- Универсальная функция запроса ---
-async def _request(method: str, params: dict = None, use_post: bool = False) -> dict:
+async def close_session():
+    """Закрывает глобальную сессию и все соединения пула."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+        # Даём SSL-соединениям корректно закрыться
+        await asyncio.sleep(0.25)
+        logger.info("🌐 Пул соединений Lite PMS закрыт.")
+    _http_session = None
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Возвращает состояние пула: активные и простаивающие соединения, время ожидания свободного."""
+    stats: Dict[str, Any] = {
+        "limit": LITEPMS_POOL_LIMIT,
+        "limit_per_host": LITEPMS_POOL_LIMIT_PER_HOST,
+        "active": 0,
+        "idle": 0,
+        "queued": int(_pool_stats["queued"]),
+        "wait_avg": _pool_stats["wait_total"] / _pool_stats["queued"] if _pool_stats["queued"] else 0.0,
+        "wait_max": _pool_stats["wait_max"],
+        "created": int(_pool_stats["created"]),
+        "reused": int(_pool_stats["reused"]),
+    }
+    if _http_session is not None and not _http_session.closed:
+        connector = _http_session.connector
+        # У TCPConnector нет публичного API для размеров пула — читаем внутренние поля
+        stats["active"] = len(getattr(connector, "_acquired", ()))
+        stats["idle"] = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+    return stats
+
+# --- Метрики вызовов Lite PMS ---
+_requests_total = Counter("litepms_requests_total", "Вызовы Lite PMS", ("method", "result"))
+_request_duration = Histogram("litepms_request_duration_seconds", "Время вызова Lite PMS", ("method",))
+_retries_total = Counter("litepms_retries_total", "Повторы вызовов Lite PMS", ("method",))
+
+
+def _collect_pool_gauges() -> Dict[Tuple[str, ...], float]:
+    stats = get_pool_stats()
+    return {("active",): stats["active"], ("idle",): stats["idle"]}
+
+
+Gauge("litepms_pool_connections", "Соединения в пуле Lite PMS", _collect_pool_gauges, ("state",))
+
+
+def _observe_request(method: str, result: str, started: float):
+    """Учитывает вызов метода: итог (ok / error / circuit_open) и полное время с учётом повторов."""
+    _requests_total.inc(method, result)
+    _request_duration.observe(time.monotonic() - started, method)
+
+# --- Устойчивость: повторы, circuit breaker, ограничение частоты ---
+# Методы только на чтение — их безопасно повторять
+IDEMPOTENT_METHODS = {"getRooms", "getCategories", "searchBooking", "getCashboxTransaction"}
+# HTTP-статусы, при которых имеет смысл повторить запрос
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+
+_breaker = CircuitBreaker("litepms", LITEPMS_BREAKER_FAILURES, LITEPMS_BREAKER_RESET)
+_rate_limiters: Dict[str, TokenBucket] = {}
+
+def _get_rate_limiter(method: str) -> TokenBucket:
+    """Возвращает token bucket для метода, создавая его при первом вызове."""
+    limiter = _rate_limiters.get(method)
+    if limiter is None:
+        rate = LITEPMS_RATE_LIMITS.get(method, LITEPMS_RATE_LIMIT)
+        limiter = TokenBucket(rate, LITEPMS_RATE_BURST)
+        _rate_limiters[method] = limiter
+    return limiter
+
+# --- Ошибки записи ---
+class PMSRejectedError(RuntimeError):
+    """Lite PMS ответил и отклонил запрос (ошибка в ответе, HTTP 4xx) — повтор не поможет."""
+
+def _raise_write_error(method: str, result: dict):
     """
-    Универсальная функция для выполнения GET или POST запросов к Lite PMS API.
+    Выбрасывает ошибку записи: PMSRejectedError, если Lite PMS отклонил запрос,
+    иначе RuntimeError (сеть, таймаут, 5xx, разомкнутый circuit breaker).
     """
-    params = params or {}
-    params.update({"login": LITEPMS_LOGIN, "hash": LITEPMS_API_KEY})
+    error_msg = result.get("data", "Неизвестная ошибка или некорректный ответ от API.")
+    error_cls = RuntimeError if result.get("temporary") else PMSRejectedError
+    raise error_cls(f"Lite PMS вернул ошибку ({method}): {error_msg}")
 
+# --- Универсальная функция запроса ---
+async def _request_once(method: str, params: dict, use_post: bool) -> Tuple[dict, bool]:
+    """
+    Выполняет одну попытку запроса к Lite PMS.
+    :return: Ответ в формате {"status": ...} и признак временной ошибки, которую можно повторить.
+    """
     session = await get_session()
     url = f"{BASE_URL}/{method}"
 
@@ -37,7 +189,7 @@ async def _request(method: str, params: dict = None, use_post: bool = False) ->
                 if resp.status != 200:
                     error_text = await resp.text()
                     logger.error(f"Ошибка HTTP {resp.status} при POST {method}: {error_text}")
-                    return {"status": "error", "data": error_text}
+                    return {"status": "error", "data": error_text}, resp.status in RETRYABLE_HTTP_STATUSES
                 data = await resp.json()
         else:
             async with session.get(url, params=params) as resp:
@@ -45,28 +197,197 @@ async def _request(method: str, params: dict = None, use_post: bool = False) ->
                 if resp.status != 200:
                     error_text = await resp.text()
                     logger.error(f"Ошибка HTTP {resp.status} при GET {method}: {error_text}")
-                    return {"status": "error", "data": error_text}
+                    return {"status": "error", "data": error_text}, resp.status in RETRYABLE_HTTP_STATUSES
                 data = await resp.json()
 
         # Унифицированная проверка успешности ответа
         if not isinstance(data, dict):
             logger.error(f"Неверный формат ответа от {method}: ожидался dict, получен {type(data)}")
-            return {"status": "error", "data": "Неверный формат ответа от API"}
+            return {"status": "error", "data": "Неверный формат ответа от API"}, False
 
         # Lite PMS может возвращать "status" или "success"
         if data.get("status") == "success" or data.get("success") == "true":
-            return data
+            return data, False
         else:
             error_msg = data.get("data", "Неизвестная ошибка или некорректный ответ от API.")
             logger.warning(f"API {method} вернул ошибку: {error_msg}")
-            return {"status": "error", "data": error_msg}
+            return {"status": "error", "data": error_msg}, False
 
-    except aiohttp.ClientError as e:
-        logger.error(f"Сетевая ошибка при вызове {method}: {e}")
-        return {"status": "error", "data": f"Сетевая ошибка: {e}"}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Сетевая ошибка при вызове {method}: {e!r}")
+        return {"status": "error", "data": f"Сетевая ошибка: {e!r}"}, True
     except Exception as e:
         logger.critical(f"Неожиданная ошибка в _request({method}): {e}", exc_info=True)
-        return {"status": "error", "data": f"Внутренняя ошибка: {e}"}
+        return {"status": "error", "data": f"Внутренняя ошибка: {e}"}, False
+
+async def _request(method: str, params: dict = None, use_post: bool = False) -> dict:
+    """
+    Универсальная функция для выполнения GET или POST запросов к Lite PMS API.
+    Идемпотентные методы повторяются при сетевых сбоях и 5xx с экспоненциальной задержкой;
+    при серии сбоев circuit breaker сразу возвращает ошибку, не дожидаясь таймаутов.
+    Ошибка, которую можно повторить позже (сеть, 5xx, circuit breaker), помечена "temporary": True.
+    """
+    params = dict(params or {})
+    params.update({"login": LITEPMS_LOGIN, "hash": LITEPMS_API_KEY})
+
+    attempts = max(1, LITEPMS_RETRY_ATTEMPTS) if method in IDEMPOTENT_METHODS else 1
+    result = {"status": "error", "data": "Lite PMS временно недоступен, попробуйте позже.", "temporary": True}
+    started = time.monotonic()
+    for attempt in range(1, attempts + 1):
+        probe = _breaker.state == "half-open"
+        if not _breaker.allow():
+            logger.warning(f"🔌 Запрос {method} не отправлен: circuit breaker разомкнут ({_breaker.state}).")
+            _observe_request(method, "circuit_open", started)
+            return result
+
+        try:
+            await _get_rate_limiter(method).acquire()
+            result, retryable = await _request_once(method, params, use_post)
+        except BaseException:
+            # Отменённый пробный запрос не должен навсегда оставить breaker в half-open
+            if probe:
+                _breaker.release_probe()
+            raise
+        if not retryable:
+            _breaker.record_success()
+            _observe_request(method, "error" if result.get("status") == "error" else "ok", started)
+            return result
+
+        _breaker.record_failure()
+        if attempt < attempts:
+            delay = backoff_delay(attempt, LITEPMS_RETRY_BASE_DELAY, LITEPMS_RETRY_MAX_DELAY)
+            logger.warning(f"🔁 Повтор {method} через {delay:.2f} с (попытка {attempt + 1}/{attempts}).")
+            _retries_total.inc(method)
+            await asyncio.sleep(delay)
+
+    _observe_request(method, "error", started)
+    return {**result, "temporary": True}
+
+# --- Потоковый запрос ---
+# Размер фрагмента, читаемого из тела ответа
+STREAM_CHUNK_SIZE = 64 * 1024
+
+async def _stream_request(method: str, params: dict = None) -> AsyncIterator[Any]:
+    """
+    POST-запрос к Lite PMS, который отдаёт элементы массива "data" по мере чтения ответа.
+    Повторов нет: часть записей уже могла быть отдана вызывающему.
+    При сетевом сбое посреди ответа выбрасывает RuntimeError, чтобы неполные данные
+    не выглядели как полные.
+    """
+    params = dict(params or {})
+    params.update({"login": LITEPMS_LOGIN, "hash": LITEPMS_API_KEY})
+
+    started = time.monotonic()
+    probe = _breaker.state == "half-open"
+    if not _breaker.allow():
+        logger.warning(f"🔌 Запрос {method} не отправлен: circuit breaker разомкнут ({_breaker.state}).")
+        _observe_request(method, "circuit_open", started)
+        raise RuntimeError("Lite PMS временно недоступен, попробуйте позже.")
+
+    url = f"{BASE_URL}/{method}"
+    result = "error"
+    try:
+        await _get_rate_limiter(method).acquire()
+        session = await get_session()
+        async with session.post(url, data=params) as resp:
+            logger.debug(f"POST (stream) {url} с параметрами: {params}")
+            if resp.status != 200:
+                error_text = await resp.text()
+                if resp.status in RETRYABLE_HTTP_STATUSES:
+                    _breaker.record_failure()
+                else:
+                    _breaker.record_success()
+                logger.error(f"Ошибка HTTP {resp.status} при POST {method}: {error_text}")
+                raise RuntimeError(f"Lite PMS вернул ошибку HTTP {resp.status}")
+            _breaker.record_success()
+
+            async for item in iter_json_array(resp.content.iter_chunked(STREAM_CHUNK_SIZE), key="data"):
+                yield item
+            result = "ok"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        _breaker.record_failure()
+        logger.error(f"Сетевая ошибка при потоковом вызове {method}: {e!r}")
+        raise RuntimeError(f"Сетевая ошибка: {e!r}") from e
+    except ArrayNotFoundError as e:
+        # HTTP 200 с {"status": "error", ...} или без "data" — ошибка, а не пустой список
+        logger.error(f"Потоковый ответ {method} без массива данных: {e}")
+        raise RuntimeError(f"Lite PMS вернул ошибку ({method}): {e}") from e
+    except ValueError as e:
+        logger.error(f"Некорректный JSON в потоковом ответе {method}: {e}")
+        raise RuntimeError(f"Некорректный ответ от API: {e}") from e
+    except BaseException:
+        # Отмена до ответа Lite PMS: пробный запрос не завершился ни успехом, ни сбоем
+        if probe:
+            _breaker.release_probe()
+        raise
+    finally:
+        # Время потокового вызова — до конца чтения ответа (или до прерывания)
+        _observe_request(method, result, started)
+
+# --- Запрос длинных периодов частями ---
+def split_date_range(from_date: str, to_date: str, chunk_days: int) -> List[Tuple[str, str]]:
+    """Делит период [from_date, to_date] на последовательные части по chunk_days дней (включительно)."""
+    start = date.fromisoformat(from_date)
+    end = date.fromisoformat(to_date)
+    step = timedelta(days=max(1, chunk_days))
+    chunks = []
+    while start <= end:
+        chunk_end = min(end, start + step - timedelta(days=1))
+        chunks.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+async def _fetch_list(method: str, params: dict) -> List[dict]:
+    """Выполняет POST-запрос, возвращающий список; при ошибке выбрасывает RuntimeError."""
+    data = await _request(method, params, use_post=True)
+    if data.get("status") != "success":
+        raise RuntimeError(f"Lite PMS вернул ошибку ({method}): {data.get('data')}")
+    return data.get("data") or []
+
+async def fetch_range_chunked(
+    fetch: Callable[[str, str], Awaitable[List[dict]]],
+    from_date: str,
+    to_date: str,
+    chunk_days: int = RANGE_CHUNK_DAYS,
+    concurrency: int = RANGE_FETCH_CONCURRENCY,
+    id_key: str = "id"
+) -> List[dict]:
+    """
+    Запрашивает период частями параллельно (не больше concurrency запросов сразу),
+    склеивает результаты в хронологическом порядке частей и убирает дубликаты по id_key.
+    Если хотя бы одна часть не загрузилась, ошибка пробрасывается — неполный результат не возвращается.
+    :param fetch: Функция запроса одной части: fetch(from_date, to_date) -> список записей.
+    """
+    chunks = split_date_range(from_date, to_date, chunk_days)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _fetch_chunk(chunk: Tuple[str, str]) -> List[dict]:
+        async with semaphore:
+            return await fetch(*chunk)
+
+    tasks = [asyncio.create_task(_fetch_chunk(chunk)) for chunk in chunks]
+    try:
+        parts = await asyncio.gather(*tasks)
+    except BaseException:
+        # Ошибка одной части (или отмена вызывающего) отменяет остальные: иначе их запросы
+        # продолжали бы нагружать Lite PMS, хотя результат уже никому не нужен
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    merged: List[dict] = []
+    seen = set()
+    for part in parts:
+        for record in part:
+            record_id = record.get(id_key)
+            if record_id is not None:
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+            merged.append(record)
+    logger.debug(f"Период {from_date}..{to_date}: {len(chunks)} частей, {len(merged)} записей.")
+    return merged
 
 # --- Rooms ---
 async def fetch_rooms() -> Dict[str, dict]:
@@ -87,18 +408,32 @@ async def fetch_categories() -> Dict[str, str]:
     return {}
 
 # --- Bookings ---
-async def search_checkins(from_date: str, to_date: str) -> List[dict]:
-    """Ищет заезды в указанный период."""
+async def search_checkins(from_date: str, to_date: str) -> List[Booking]:
+    """Ищет заезды в указанный период. Записи разбираются в Booking один раз здесь."""
     data = await _request("searchBooking", {
         "from_date": from_date,
         "to_date": to_date,
         "type": "checkin"
     }, use_post=True)
     if data.get("status") == "success":
-        return data.get("data", [])
+        return parse_bookings(data.get("data", []))
     logger.error(f"Ошибка search_checkins: {data}")
     return []
 
+async def search_checkins_range(from_date: str, to_date: str, chunk_days: int = RANGE_CHUNK_DAYS) -> List[Booking]:
+    """
+    Ищет заезды за длинный период, запрашивая его частями параллельно.
+    :raises RuntimeError: Если хотя бы одна часть периода не загрузилась.
+    """
+    async def _fetch(chunk_from: str, chunk_to: str) -> List[dict]:
+        return await _fetch_list("searchBooking", {
+            "from_date": chunk_from,
+            "to_date": chunk_to,
+            "type": "checkin"
+        })
+
+    return parse_bookings(await fetch_range_chunked(_fetch, from_date, to_date, chunk_days))
+
 # --- Cashbox ---
 async def get_cashbox_transactions(from_date: str, to_date: str) -> List[dict]:
     """Получает кассовые операции за период."""
@@ -111,6 +446,30 @@ async def get_cashbox_transactions(from_date: str, to_date: str) -> List[dict]:
     logger.error(f"Ошибка get_cashbox_transactions: {data}")
     return []
 
+async def iter_cashbox_transactions(from_date: str, to_date: str) -> AsyncIterator[dict]:
+    """
+    Потоково отдаёт кассовые операции за период, не загружая весь ответ в память.
+    :raises RuntimeError: Если Lite PMS недоступен или ответ оборвался.
+    """
+    async for tx in _stream_request("getCashboxTransaction", {
+        "from_date": from_date,
+        "to_date": to_date,
+    }):
+        yield tx
+
+async def get_cashbox_transactions_range(from_date: str, to_date: str, chunk_days: int = RANGE_CHUNK_DAYS) -> List[dict]:
+    """
+    Получает кассовые операции за длинный период, запрашивая его частями параллельно.
+    :raises RuntimeError: Если хотя бы одна часть периода не загрузилась.
+    """
+    async def _fetch(chunk_from: str, chunk_to: str) -> List[dict]:
+        return await _fetch_list("getCashboxTransaction", {
+            "from_date": chunk_from,
+            "to_date": chunk_to,
+        })
+
+    return await fetch_range_chunked(_fetch, from_date, to_date, chunk_days)
+
 async def add_cashbox_transaction(
     price: float,
     type: int,
@@ -137,9 +496,10 @@ async def add_cashbox_transaction(
 
     result = await _request("addCashboxTransaction", data, use_post=True)
     if result.get("success") != "true":
-        error_msg = result.get("data", "Неизвестная ошибка или некорректный ответ от API.")
-        logger.error(f"Ошибка add_cashbox_transaction: {error_msg}")
-        raise RuntimeError(f"Lite PMS вернул ошибку: {error_msg}")
+        logger.error(f"Ошибка add_cashbox_transaction: {result.get('data')}")
+        _raise_write_error("addCashboxTransaction", result)
+    # Lite PMS проводит операцию текущей датой
+    events.publish(events.CASHBOX_CHANGED, day=date.today().isoformat(), booking_id=booking_id)
     return result
 
 # --- Cleaning ---
@@ -150,16 +510,39 @@ async def set_cleaning_status(room_id: str, status_id: str = "0") -> dict:
         "status_id": status_id
     }, use_post=True)
     if result.get("success") != "true":
-        error_msg = result.get("data", "Неизвестная ошибка или некорректный ответ от API.")
-        logger.error(f"Ошибка set_cleaning_status для room_id={room_id}: {error_msg}")
-        raise RuntimeError(f"Lite PMS вернул ошибку: {error_msg}")
+        logger.error(f"Ошибка set_cleaning_status для room_id={room_id}: {result.get('data')}")
+        _raise_write_error("setRoomCleaningStatus", result)
     return result
 
+async def set_cleaning_status_many(
+    room_ids: List[str],
+    status_id: str = "0",
+    concurrency: int = CLEANING_BULK_CONCURRENCY
+) -> Dict[str, Union[dict, Exception]]:
+    """
+    Устанавливает статус уборки для нескольких номеров параллельно (не больше concurrency запросов сразу).
+    :return: {room_id: ответ API или исключение} в порядке переданных room_ids (без дубликатов).
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    unique_ids = list(dict.fromkeys(str(room_id) for room_id in room_ids))
+
+    async def _set_one(room_id: str) -> Union[dict, Exception]:
+        async with semaphore:
+            try:
+                return await set_cleaning_status(room_id, status_id)
+            except Exception as e:
+                return e
+
+    results = await asyncio.gather(*(_set_one(room_id) for room_id in unique_ids))
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    logger.info(f"Массовое обновление статуса уборки: {len(unique_ids) - failed} успешно, {failed} с ошибкой.")
+    return dict(zip(unique_ids, results))
+
 # --- Helpers ---
-def format_guest_name(booking: dict) -> str:
+def format_guest_name(booking: Booking) -> str:
     """Форматирует имя гостя из данных бронирования."""
-    surname = str(booking.get("client_surname", "")).strip()
-    name = str(booking.get("client_name", "")).strip()
+    surname = booking.surname
+    name = booking.name
     if surname and name:
         return f"{surname} {name[0]}."
     elif surname:
@@ -169,10 +552,6 @@ def format_guest_name(booking: dict) -> str:
     else:
         return "Гость без имени"
 
-def is_active_status(status_id: str) -> bool:
-    """Проверяет, является ли статус активным."""
-    return status_id in ("2", "6", "8")
-
 def get_room_name(room_id: str, rooms_cache: dict) -> str:
     """Возвращает название номера по его ID, используя кэш."""
     room_data = rooms_cache.get(room_id, {})
@@ -183,30 +562,25 @@ def get_room_name(room_id: str, rooms_cache: dict) -> str:
     else:
         return f"ID {room_id}"
 
-# --- Функция для получения номеров по категориям ---
-async def fetch_rooms_by_categories(category_names: List[str]) -> Dict[str, str]:
-    """Получает номера, принадлежащие указанным категориям."""
-    # Получаем все категории
-    all_categories = await fetch_categories()
-    
-    # Находим ID нужных категорий
-    target_category_ids = [
-        cat_id for cat_id, cat_name in all_categories.items()
-        if cat_name in category_names
-    ]
-    
-    if not target_category_ids:
-        logger.warning(f"Не найдены категории с именами: {category_names}")
-        return {}
-
-    # Получаем все номера (полные данные)
-    all_rooms = await fetch_rooms()
-    
-    # Фильтруем номера по категориям
-    filtered_rooms = {}
-    for room_id, room_data in all_rooms.items():
-        cat_id = str(room_data.get("cat_id", ""))
-        if cat_id in target_category_ids:
-            filtered_rooms[room_id] = room_data["name"]
-    
-    return filtered_rooms
\ No newline at end of file
+# --- Функции для получения номеров по категориям ---
+def build_category_index(categories: Dict[str, str], rooms: Dict[str, dict]) -> Dict[str, Dict[str, str]]:
+    """
+    Строит индекс "название категории -> {room_id: название номера}".
+    :param categories: Результат fetch_categories().
+    :param rooms: Результат fetch_rooms().
+    """
+    index: Dict[str, Dict[str, str]] = {name: {} for name in categories.values()}
+    for room_id, room_data in rooms.items():
+        cat_name = categories.get(str(room_data.get("cat_id", "")))
+        if cat_name is not None:
+            index[cat_name][room_id] = room_data["name"]
+    return index
+
+def select_rooms_by_categories(index: Dict[str, Dict[str, str]], category_names: List[str]) -> Dict[str, str]:
+    """Объединяет номера указанных категорий из индекса build_category_index."""
+    filtered_rooms: Dict[str, str] = {}
+    for cat_name in category_names:
+        filtered_rooms.update(index.get(cat_name, {}))
+    if not filtered_rooms:
+        logger.warning(f"Не найдены номера в категориях с именами: {category_names}")
+    return filtered_rooms
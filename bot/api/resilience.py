@@ -0,0 +1,96 @@
+# bot/api/resilience.py
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float, max_delay: float) -> float:
+    """
+    Задержка перед повтором: экспоненциальная с полным джиттером.
+    :param attempt: Номер неудачной попытки, начиная с 1.
+    """
+    return random.uniform(0, min(max_delay, base * (2 ** (attempt - 1))))
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, не больше capacity в запасе."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждёт, пока появится свободный токен, и забирает его."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи: после failure_threshold сбоев подряд запросы не пропускаются
+    reset_timeout секунд, затем пропускается один пробный запрос.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """
+        Освобождает пробный запрос, который не завершился ни успехом, ни сбоем (например, отменён):
+        иначе в состоянии half-open не прошёл бы больше ни один запрос.
+        """
+        self._probe_in_flight = False
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"✅ Circuit breaker {self.name}: соединение восстановлено.")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.error(f"🔌 Circuit breaker {self.name}: {self._failures} сбоев подряд, запросы приостановлены на {self.reset_timeout} с.")
+            self._opened_at = time.monotonic()
@@ -0,0 +1,104 @@
+# bot/booking_columns.py
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List
+
+from bot.api.booking import Booking
+
+
+class BookingColumns:
+    """
+    Брони в колонках: даты — порядковые номера дней (date.toordinal()), время — минуты
+    от начала суток, номер — индекс в room_ids. Строка брони находится по её ключу (row_of),
+    поэтому сводка читает только строки, отобранные индексами дат хранилища.
+    """
+
+    def __init__(self, bookings: Iterable[Booking]):
+        self.room_ids: List[str] = []
+        room_pos: Dict[str, int] = {}
+        self.row_of: Dict[str, int] = {}
+        self.room = array("I")
+        self.date_in = array("i")
+        self.date_out = array("i")
+        self.time_in = array("H")
+        self.time_out = array("H")
+        self.guests = array("H")
+        self.active = array("B")
+
+        for b in bookings:
+            pos = room_pos.get(b.room_id)
+            if pos is None:
+                pos = room_pos[b.room_id] = len(self.room_ids)
+                self.room_ids.append(b.room_id)
+
+            self.row_of[b.key] = len(self.room)
+            self.room.append(pos)
+            self.date_in.append(b.day_in.toordinal())
+            self.date_out.append(b.day_out.toordinal())
+            self.time_in.append(b.time_in)
+            self.time_out.append(b.time_out)
+            self.guests.append(b.guests)
+            self.active.append(1 if b.active else 0)
+
+    def __len__(self) -> int:
+        return len(self.room)
+
+    def rows(self, keys: Iterable[str]) -> List[int]:
+        """Строки броней с указанными ключами (ключи, которых нет в колонках, пропускаются)."""
+        row_of = self.row_of
+        return [row_of[key] for key in keys if key in row_of]
+
+    def room_index(self, room_id: str) -> int:
+        """Индекс номера в колонке room или -1, если броней в этот номер нет."""
+        try:
+            return self.room_ids.index(room_id)
+        except ValueError:
+            return -1
+
+
+def summarize_day(
+    columns: BookingColumns,
+    day: date,
+    stay_keys: Iterable[str],
+    departure_keys: Iterable[str],
+    spa_room_ids: Iterable[str] = (),
+) -> dict:
+    """
+    Сводка по активным броням за день. Читаются только строки-кандидаты, которые вызывающий
+    берёт из индексов дат (см. booking_store.get_day_summary).
+    :param stay_keys: Брони с заездом с day - BOOKING_MAX_STAY_NIGHTS по day: среди них заезды,
+                      проживающие и СПА дня. Проживающие точны, если в колонках есть все эти заезды
+                      (см. booking_store.complete_from).
+    :param departure_keys: Брони с выездом в day.
+    :param spa_room_ids: Помещения СПА — их брони считаются отдельно и не входят в заезды и проживающих.
+    :return: {"arrivals", "departures": число броней (без СПА),
+              "in_house_rooms": число занятых номеров в ночь day, "in_house_guests": гостей в них,
+              "guests_by_room": {room_id: гостей}, "spa_bookings", "spa_minutes", "spa_guests"}.
+    """
+    d = day.toordinal()
+    spa = {columns.room_index(room_id) for room_id in spa_room_ids} - {-1}
+    room, date_in, date_out, active = columns.room, columns.date_in, columns.date_out, columns.active
+    rows = [i for i in columns.rows(stay_keys) if active[i]]
+
+    spa_rows = [i for i in rows if room[i] in spa and date_in[i] == d]
+    departures = sum(
+        1 for i in columns.rows(departure_keys) if active[i] and room[i] not in spa and date_out[i] == d
+    )
+    arrivals = sum(1 for i in rows if room[i] not in spa and date_in[i] == d)
+    guests_by_pos: Dict[int, int] = {}
+    for i in rows:
+        if room[i] not in spa and date_in[i] <= d < date_out[i]:
+            guests_by_pos[room[i]] = guests_by_pos.get(room[i], 0) + columns.guests[i]
+
+    return {
+        "arrivals": arrivals,
+        "departures": departures,
+        "in_house_rooms": len(guests_by_pos),
+        "in_house_guests": sum(guests_by_pos.values()),
+        "guests_by_room": {columns.room_ids[pos]: guests for pos, guests in guests_by_pos.items()},
+        "spa_bookings": len(spa_rows),
+        "spa_minutes": sum(
+            max(0, (date_out[i] - date_in[i]) * 1440 + columns.time_out[i] - columns.time_in[i]) for i in spa_rows
+        ),
+        "spa_guests": sum(columns.guests[i] for i in spa_rows),
+    }
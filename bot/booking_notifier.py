@@ -0,0 +1,121 @@
+# bot/booking_notifier.py
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bot import booking_store
+from bot.api.booking import Booking, format_time
+from bot.api.litepms import format_guest_name
+from bot.auth.roles import USER_ROLES
+from bot.cache import get_room_name
+from bot.config import SPA_ROOM_IDS, BOOKING_NOTIFY_ROLES, BOOKING_NOTIFY_DAYS_AHEAD
+from bot.utils.digests import deliver
+from bot.utils.permissions import has_permission
+
+logger = logging.getLogger(__name__)
+
+Change = Tuple[Optional[Booking], Optional[Booking]]
+
+# --- Уведомления об изменениях бронирований ---
+# Хранилище после каждой синхронизации передаёт только изменившиеся брони
+# (сравнение Booking.__eq__ по всем полям, которые видны в /arrival и /spa).
+
+# Изменения ждут отправки; очередь создаёт обработчик при запуске
+_queue: Optional[asyncio.Queue] = None
+
+
+def _is_near(booking: Booking, today: date) -> bool:
+    return today <= booking.day_in <= today + timedelta(days=BOOKING_NOTIFY_DAYS_AHEAD)
+
+
+def _is_spa(booking: Booking) -> bool:
+    return booking.room_id in SPA_ROOM_IDS
+
+
+def _when(booking: Booking) -> str:
+    return booking.day_in.strftime("%d.%m")
+
+
+def _spa_time(booking: Booking) -> str:
+    return f"{_when(booking)} {format_time(booking.time_in)}–{format_time(booking.time_out)}"
+
+
+def describe_changes(changes: List[Change], today: date, window_start: Optional[date] = None) -> Dict[str, List[str]]:
+    """
+    Превращает изменившиеся брони в строки уведомлений.
+    :param window_start: Первый день заездов в окне хранилища после синхронизации.
+    :return: {право доступа ("arrival" / "spa"): [строки]}.
+    """
+    lines: Dict[str, List[str]] = {"arrival": [], "spa": []}
+    for old, new in changes:
+        if old is not None and new is not None and old == new:
+            continue
+        booking = new if new is not None else old
+        # Граница старого и нового окна: бронь с заездом раньше начала нового окна пропадает
+        # из снимка, потому что окно сдвинулось, а не потому что её отменили, — такие ключи пропускаем
+        if window_start is not None and booking.day_in < window_start:
+            continue
+        was_active = old is not None and old.active
+        is_active = new is not None and new.active
+        audience = "spa" if _is_spa(booking) else "arrival"
+        guest = format_guest_name(booking)
+
+        if is_active and not was_active:
+            if _is_near(new, today):
+                if _is_spa(new):
+                    lines[audience].append(f"🆕 СПА: {guest}, {_spa_time(new)}")
+                else:
+                    lines[audience].append(f"🆕 Новый заезд: {get_room_name(new.room_id)} — {guest}, {_when(new)}")
+        elif was_active and not is_active:
+            if _is_near(old, today):
+                place = "СПА" if _is_spa(old) else get_room_name(old.room_id)
+                lines["spa" if _is_spa(old) else "arrival"].append(f"❌ Отмена: {place} — {guest}, {_when(old)}")
+        elif is_active and was_active and (_is_near(old, today) or _is_near(new, today)):
+            if old.room_id != new.room_id:
+                lines[audience].append(
+                    f"🔄 Смена номера: {guest}, {get_room_name(old.room_id)} → {get_room_name(new.room_id)} ({_when(new)})"
+                )
+            elif _is_spa(new) and (old.date_in, old.date_out) != (new.date_in, new.date_out):
+                lines[audience].append(f"🕒 СПА: {guest}, {_spa_time(old)} → {_spa_time(new)}")
+    return lines
+
+
+def _recipients(permission: str) -> List[int]:
+    return [
+        chat_id for chat_id, role in USER_ROLES.items()
+        if role in BOOKING_NOTIFY_ROLES and has_permission(chat_id, permission)
+    ]
+
+
+def _on_changes(changes: List[Change]):
+    """Обработчик хранилища: вызывается синхронно, отправка выполняется в фоне."""
+    if _queue is not None and BOOKING_NOTIFY_ROLES:
+        # Начало окна запоминается сейчас: к отправке хранилище может синхронизироваться ещё раз
+        window = booking_store.get_sync_info()["window"]
+        _queue.put_nowait((changes, date.fromisoformat(window[0]) if window else None))
+
+
+booking_store.add_change_listener(_on_changes)
+
+
+async def run_booking_notifier(bot):
+    """
+    Рассылает изменения бронирований ролям из BOOKING_NOTIFY_ROLES:
+    по одному сообщению на синхронизацию для каждого адресата.
+    :param bot: Экземпляр aiogram.Bot.
+    """
+    global _queue
+    _queue = asyncio.Queue()
+    while True:
+        changes, window_start = await _queue.get()
+        try:
+            lines = describe_changes(changes, date.today(), window_start)
+            for permission, entries in lines.items():
+                if not entries:
+                    continue
+                text = "🔔 Изменения в бронированиях:\n" + "\n".join(entries)
+                sent, failed = await deliver(bot, "booking_changes", _recipients(permission), text)
+                logger.info(f"🔔 Изменения бронирований ({permission}): {len(entries)} шт., доставлено {sent}, ошибок {failed}.")
+        except Exception as e:
+            logger.error(f"❌ Ошибка рассылки изменений бронирований: {e}", exc_info=True)
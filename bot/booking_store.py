@@ -0,0 +1,322 @@
+# bot/booking_store.py
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from bot.api.booking import Booking, parse_bookings
+from bot.api.litepms import search_checkins_range
+from bot.booking_columns import BookingColumns, summarize_day
+from bot.config import (
+    BOOKING_STORE_DAYS_BACK,
+    BOOKING_MAX_STAY_NIGHTS,
+    BOOKING_STORE_DAYS_AHEAD,
+    BOOKING_STORE_MAX_AGE,
+    BOOKING_STORE_NEAR_DAYS,
+    BOOKING_STORE_FULL_SYNC_INTERVAL,
+)
+from bot.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# --- Локальное хранилище бронирований ---
+# Скользящее окно заездов (от -max(BOOKING_STORE_DAYS_BACK, BOOKING_MAX_STAY_NIGHTS)
+# до +BOOKING_STORE_DAYS_AHEAD дней),
+# которое фоновая задача поддерживает в актуальном состоянии.
+_bookings: Dict[str, Booking] = {}
+# Индексы: дата заезда / дата выезда и room_id -> множество ID броней
+_by_checkin: Dict[date, Set[str]] = defaultdict(set)
+_by_checkout: Dict[date, Set[str]] = defaultdict(set)
+_by_room: Dict[str, Set[str]] = defaultdict(set)
+
+_window: Optional[Tuple[str, str]] = None
+# Время последней полной синхронизации окна — по нему судят о свежести всех данных
+_last_synced: Optional[datetime] = None
+# Время последней синхронизации ближних заездов (между полными)
+_last_near_synced: Optional[datetime] = None
+_last_error: Optional[str] = None
+# Растёт при каждом изменении содержимого: по нему узнают, что производные данные устарели
+_version = 0
+# Те же брони в колонках (см. bot.booking_columns), перестраиваются при каждом изменении
+_columns = BookingColumns(())
+STORE_LOCK = asyncio.Lock()
+# Вызываются после каждой успешной синхронизации
+_sync_listeners: List[Callable[[], None]] = []
+# Получают изменившиеся брони [(старая или None, новая или None)] после синхронизации
+_change_listeners: List[Callable[[List[Tuple[Optional[Booking], Optional[Booking]]]], None]] = []
+
+
+def _index_add(key: str, booking: Booking):
+    _by_checkin[booking.day_in].add(key)
+    _by_checkout[booking.day_out].add(key)
+    _by_room[booking.room_id].add(key)
+
+
+def _discard(index: Dict, value, key: str):
+    keys = index.get(value)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del index[value]
+
+
+def _index_remove(key: str, booking: Booking):
+    _discard(_by_checkin, booking.day_in, key)
+    _discard(_by_checkout, booking.day_out, key)
+    _discard(_by_room, booking.room_id, key)
+
+
+def _apply_snapshot(
+    fresh: Dict[str, Booking],
+    changes: Optional[List[Tuple[Optional[Booking], Optional[Booking]]]] = None,
+    partial: bool = False,
+) -> Tuple[int, int, int]:
+    """
+    Применяет новый снимок окна к хранилищу, трогая только изменившиеся записи.
+    :param changes: Если передан, в него добавляются пары (старая, новая) изменившихся броней.
+    :param partial: Снимок только части окна (ближние заезды). Отсутствующие в нём брони не удаляются:
+                    бронь, перенесённая за пределы части, в ответ не попадает, но не отменена.
+                    Удаления применяет только полная синхронизация.
+    :return: Количество добавленных, изменённых и удалённых броней.
+    """
+    added = changed = removed = 0
+    for key in ([] if partial else list(_bookings)):
+        if key not in fresh:
+            old = _bookings.pop(key)
+            _index_remove(key, old)
+            removed += 1
+            if changes is not None:
+                changes.append((old, None))
+    for key, booking in fresh.items():
+        old = _bookings.get(key)
+        if old is None:
+            added += 1
+        elif old != booking:
+            _index_remove(key, old)
+            changed += 1
+        else:
+            continue
+        if changes is not None:
+            changes.append((old, booking))
+        _bookings[key] = booking
+        _index_add(key, booking)
+    if added or changed or removed:
+        global _version, _columns
+        _version += 1
+        # Колонки для сводок строятся из уже разобранных броней
+        _columns = BookingColumns(_bookings.values())
+    return added, changed, removed
+
+
+def _needs_full_sync(from_date: str, to_date: str) -> bool:
+    if _window != (from_date, to_date) or _last_synced is None:
+        return True
+    return datetime.now() - _last_synced >= timedelta(seconds=BOOKING_STORE_FULL_SYNC_INTERVAL)
+
+
+async def sync_bookings() -> bool:
+    """
+    Загружает бронирования из Lite PMS и применяет изменения к индексам.
+    Обычно запрашиваются только ближние заезды (сегодня и ещё BOOKING_STORE_NEAR_DAYS дней);
+    всё окно — раз в BOOKING_STORE_FULL_SYNC_INTERVAL секунд, при смене дня и до первой полной загрузки.
+    Ближняя синхронизация только добавляет и обновляет брони; удаляет их лишь полная.
+    :return: True, если синхронизация прошла успешно.
+    """
+    global _window, _last_synced, _last_near_synced, _last_error
+    today = date.today()
+    # Окно захватывает заезды самых длинных проживаний, которые ещё не закончились
+    from_date = (today - timedelta(days=max(BOOKING_STORE_DAYS_BACK, BOOKING_MAX_STAY_NIGHTS))).isoformat()
+    to_date = (today + timedelta(days=BOOKING_STORE_DAYS_AHEAD)).isoformat()
+
+    async with STORE_LOCK:
+        full = _needs_full_sync(from_date, to_date)
+        if full:
+            sync_from, sync_to = from_date, to_date
+        else:
+            sync_from = today.isoformat()
+            sync_to = min(to_date, (today + timedelta(days=BOOKING_STORE_NEAR_DAYS)).isoformat())
+        try:
+            # Период запрашивается неделями параллельно; при ошибке любой части хранилище не трогаем
+            bookings = await search_checkins_range(sync_from, sync_to)
+        except RuntimeError as e:
+            _last_error = str(e)
+            logger.warning(f"⚠️ Синхронизация бронирований {sync_from}..{sync_to} не удалась: {e}")
+            return False
+
+        fresh = {b.key: b for b in bookings}
+        # Первая загрузка в пустое хранилище — не изменения, а исходное состояние
+        changes: Optional[List[Tuple[Optional[Booking], Optional[Booking]]]] = [] if _bookings else None
+        added, changed, removed = _apply_snapshot(fresh, changes, partial=not full)
+        if full:
+            _window = (from_date, to_date)
+            _last_synced = datetime.now()
+        _last_near_synced = datetime.now()
+        _last_error = None
+
+    for listener in _sync_listeners:
+        try:
+            listener()
+        except Exception as e:
+            logger.error(f"❌ Ошибка обработчика синхронизации бронирований: {e}", exc_info=True)
+    if changes:
+        for change_listener in _change_listeners:
+            try:
+                change_listener(changes)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика изменений бронирований: {e}", exc_info=True)
+
+    log = logger.info if full or added or changed or removed else logger.debug
+    log(
+        f"✅ Бронирования синхронизированы ({'окно' if full else 'ближние'} {sync_from}..{sync_to}): "
+        f"всего {len(_bookings)}, +{added} ~{changed} -{removed}."
+    )
+    return True
+
+
+def add_sync_listener(listener: Callable[[], None]):
+    """Регистрирует функцию, вызываемую после каждой успешной синхронизации."""
+    _sync_listeners.append(listener)
+
+
+def add_change_listener(listener: Callable[[List[Tuple[Optional[Booking], Optional[Booking]]]], None]):
+    """
+    Регистрирует обработчик изменений: после синхронизации он получает только изменившиеся брони
+    в виде пар (старая или None, новая или None). Восстановление из снимка и первая загрузка не передаются.
+    """
+    _change_listeners.append(listener)
+
+
+def export_state() -> dict:
+    """Возвращает содержимое хранилища для сохранения на диск."""
+    return {
+        "bookings": [booking.to_api() for booking in _bookings.values()],
+        "window": list(_window) if _window else None,
+        "last_synced": _last_synced.isoformat() if _last_synced else None,
+    }
+
+
+def restore_state(state: dict):
+    """
+    Восстанавливает хранилище из снимка на диске.
+    Время синхронизации сохраняется исходным, поэтому старые данные не выдаются за свежие.
+    """
+    global _window, _last_synced
+    if _last_synced is not None:
+        # Хранилище уже синхронизировано с Lite PMS — снимок только испортит его
+        return
+    fresh = {b.key: b for b in parse_bookings(state.get("bookings") or [])}
+    _apply_snapshot(fresh)
+    window = state.get("window")
+    _window = tuple(window) if window else None
+    last_synced = state.get("last_synced")
+    _last_synced = datetime.fromisoformat(last_synced) if last_synced else None
+    logger.info(f"📦 Хранилище бронирований восстановлено из снимка: {len(_bookings)} записей.")
+
+
+def is_fresh() -> bool:
+    """Проверяет, что последняя успешная синхронизация была не раньше BOOKING_STORE_MAX_AGE секунд назад."""
+    if _last_synced is None:
+        return False
+    return datetime.now() - _last_synced <= timedelta(seconds=BOOKING_STORE_MAX_AGE)
+
+
+def covers(from_date: str, to_date: str, allow_stale: bool = False) -> bool:
+    """
+    Проверяет, что хранилище синхронизировано и покрывает период.
+    :param allow_stale: Считать покрытием и устаревшие данные (запасной вариант, когда Lite PMS недоступен).
+    """
+    if _window is None or (not allow_stale and not is_fresh()):
+        return False
+    return _window[0] <= from_date and to_date <= _window[1]
+
+
+def _collect(keys: Set[str]) -> List[Booking]:
+    return [_bookings[key] for key in keys]
+
+
+def get_checkins(from_date: str, to_date: str) -> List[Booking]:
+    """Возвращает брони с заездом в период [from_date, to_date]."""
+    result = []
+    day = date.fromisoformat(from_date)
+    end = date.fromisoformat(to_date)
+    while day <= end:
+        result.extend(_collect(_by_checkin.get(day, set())))
+        day += timedelta(days=1)
+    return result
+
+
+def get_all_bookings() -> List[Booking]:
+    """Возвращает все брони окна."""
+    return list(_bookings.values())
+
+
+def get_room_bookings(room_id: str) -> List[Booking]:
+    """Возвращает все брони окна для номера."""
+    return _collect(_by_room.get(str(room_id), set()))
+
+
+def get_version() -> int:
+    """Версия содержимого хранилища; меняется только при добавлении, изменении или удалении броней."""
+    return _version
+
+
+def get_day_summary(day: date, spa_room_ids: Iterable[str] = ()) -> dict:
+    """
+    Сводка дня (см. bot.booking_columns.summarize_day). Строки-кандидаты берутся из индексов:
+    заезды за последние BOOKING_MAX_STAY_NIGHTS дней и выезды в day, а не всё окно.
+    """
+    stay_keys: Set[str] = set()
+    for offset in range(BOOKING_MAX_STAY_NIGHTS + 1):
+        stay_keys |= _by_checkin.get(day - timedelta(days=offset), set())
+    return summarize_day(_columns, day, stay_keys, _by_checkout.get(day, ()), spa_room_ids)
+
+
+def get_sync_info() -> dict:
+    """Возвращает метаданные синхронизации: окно, время, количество записей, последнюю ошибку."""
+    return {
+        "window": _window,
+        "last_synced": _last_synced,
+        "last_near_synced": _last_near_synced,
+        "count": len(_bookings),
+        "fresh": is_fresh(),
+        "error": _last_error,
+    }
+
+
+def complete_from() -> Optional[date]:
+    """
+    Первый день, для которого в окне есть все проживания не длиннее BOOKING_MAX_STAY_NIGHTS.
+    Для более ранних дней выезды, проживающие и занятость неполные: гости, заехавшие
+    до начала окна, в хранилище не попадают. None — хранилище не синхронизировано.
+    """
+    if _window is None:
+        return None
+    return date.fromisoformat(_window[0]) + timedelta(days=BOOKING_MAX_STAY_NIGHTS)
+
+
+def partial_note(first_day: date) -> str:
+    """Пометка для сообщения, если данные о проживающих с first_day неполные, иначе пустая строка."""
+    start = complete_from()
+    if start is None or first_day >= start:
+        return ""
+    return (
+        f"\n\n⚠️ До {start.strftime('%d.%m')} выезды, проживающие и занятость неполные (≈): "
+        f"в хранилище нет заездов раньше {date.fromisoformat(_window[0]).strftime('%d.%m')}."
+    )
+
+
+def stale_note() -> str:
+    """Возвращает пометку для сообщения, если данные хранилища устарели, иначе пустую строку."""
+    if _last_synced is None or is_fresh():
+        return ""
+    return f"\n\n⚠️ Последняя синхронизация бронирований: {_last_synced.strftime('%d.%m %H:%M')}"
+
+
+def _collect_metrics() -> Dict[Tuple[str, ...], float]:
+    age = (datetime.now() - _last_synced).total_seconds() if _last_synced else -1.0
+    return {("bookings",): len(_bookings), ("sync_age_seconds",): age}
+
+
+Gauge("booking_store", "Хранилище бронирований", _collect_metrics, ("field",))
+
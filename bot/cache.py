@@ -1,78 +1,494 @@
 # bot/cache.py
 import asyncio
+import gzip
+import json
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from bot.api.litepms import fetch_rooms  # Предполагается, что fetch_rooms возвращает dict[str, str]
+from bot.api.booking import Booking
+from bot.api.litepms import (
+    fetch_rooms,
+    fetch_categories,
+    search_checkins,
+    get_cashbox_transactions_range,
+    build_category_index,
+    select_rooms_by_categories,
+    get_room_name as _room_name_from,
+)
+from bot.config import BOOKINGS_CACHE_TTL, CASHBOX_CACHE_TTL, CACHE_SNAPSHOT_PATH, ROOM_NAME_SYNONYMS
+from bot import booking_store, events
+from bot.utils.metrics import Counter, Gauge, Histogram
+from bot.utils.room_search import DEFAULT_SYNONYMS, RoomIndex
 
 logger = logging.getLogger(__name__)
 
-# --- Глобальный кэш ---
-# Структура: {ключ_кэша: {"data": данные, "timestamp": время_загрузки}}
-_cache: Dict[str, Dict[str, Any]] = {}
-CACHE_LOCK = asyncio.Lock()
-
 # Время жизни кэша по умолчанию (в секундах) - 1 час
 DEFAULT_TTL = 3600
 
-# --- Функции для работы с кэшем ---
 
-async def _load_rooms_into_cache(ttl: int = DEFAULT_TTL):
-    """Загружает список номеров в кэш."""
+# --- Глобальный кэш ---
+# Каждый ключ регистрирует свой загрузчик, TTL и предельное число записей.
+# Записи одного ключа различаются аргументами загрузчика (например, диапазоном дат)
+# и вытесняются по LRU. Устаревшая запись отдаётся сразу, а в фоне запускается
+# одно обновление (stale-while-revalidate).
+
+class CacheRegion:
+    """Записи одного ключа кэша: {аргументы загрузчика: {"data": данные, "timestamp": время_загрузки}}."""
+
+    def __init__(
+        self,
+        key: str,
+        loader: Callable[..., Awaitable[Any]],
+        ttl: int,
+        max_entries: int,
+        max_stale: Optional[int],
+        cache_empty: bool,
+        persist: bool,
+    ):
+        self.key = key
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.max_stale = max_stale
+        self.cache_empty = cache_empty
+        self.persist = persist
+        self.entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self.inflight: Dict[Tuple, asyncio.Task] = {}
+
+    def age(self, entry: Dict[str, Any]) -> timedelta:
+        return datetime.now() - entry['timestamp']
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.age(entry) <= timedelta(seconds=self.ttl)
+
+    def is_servable(self, entry: Dict[str, Any]) -> bool:
+        """Можно ли отдать запись (свежую или устаревшую, но не старше ttl + max_stale)."""
+        if self.max_stale is None:
+            return True
+        return self.age(entry) <= timedelta(seconds=self.ttl + self.max_stale)
+
+    def put(self, args: Tuple, data: Any, timestamp: Optional[datetime] = None):
+        self.entries[args] = {'data': data, 'timestamp': timestamp or datetime.now()}
+        self.entries.move_to_end(args)
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            logger.debug(f"ℹ️ Кэш '{self.key}': вытеснена запись {evicted}.")
+
+
+_regions: Dict[str, CacheRegion] = {}
+
+# --- Метрики кэша ---
+_cache_requests = Counter("cache_requests_total", "Обращения к кэшу", ("key", "result"))
+_cache_loads = Counter("cache_loads_total", "Загрузки кэша", ("key", "result"))
+_cache_load_duration = Histogram("cache_load_duration_seconds", "Время загрузки кэша", ("key",))
+
+
+def _collect_cache_age() -> Dict[Tuple[str, ...], float]:
+    """Возраст самой свежей записи каждого ключа в секундах."""
+    ages = {}
+    for key, region in _regions.items():
+        if region.entries:
+            ages[(key,)] = min(region.age(entry) for entry in region.entries.values()).total_seconds()
+    return ages
+
+
+Gauge("cache_age_seconds", "Возраст данных в кэше, с", _collect_cache_age, ("key",))
+
+
+def register_loader(
+    key: str,
+    loader: Callable[..., Awaitable[Any]],
+    ttl: int = DEFAULT_TTL,
+    max_entries: int = 1,
+    max_stale: Optional[int] = None,
+    cache_empty: bool = False,
+    persist: bool = False,
+):
+    """
+    Регистрирует ключ кэша.
+    :param key: Имя ключа (например, 'rooms').
+    :param loader: Асинхронная функция загрузки; аргументы get_data(key, *args) передаются в неё.
+    :param ttl: Время жизни записи в секундах.
+    :param max_entries: Сколько записей с разными аргументами хранить (LRU).
+    :param max_stale: Сколько секунд после истечения TTL ещё можно отдавать устаревшие данные (None — без ограничения).
+    :param cache_empty: Кэшировать ли пустой результат (по умолчанию нет: API возвращает пустоту и при ошибке).
+    :param persist: Сохранять ли записи в снимок на диске для быстрого старта.
+    """
+    _regions[key] = CacheRegion(key, loader, ttl, max_entries, max_stale, cache_empty, persist)
+
+
+def _region(key: str) -> CacheRegion:
+    region = _regions.get(key)
+    if region is None:
+        raise KeyError(f"Ключ кэша '{key}' не зарегистрирован")
+    return region
+
+
+async def _load(region: CacheRegion, args: Tuple) -> Any:
+    """Вызывает загрузчик и сохраняет результат. При ошибке или пустом ответе старые данные не затираются."""
+    started = time.monotonic()
     try:
-        rooms_dict = await fetch_rooms()
-        if rooms_dict:
-            _cache['rooms'] = {
-                'data': rooms_dict,
-                'timestamp': datetime.now(),
-                'ttl': ttl
-            }
-            logger.info(f"✅ Кэш номеров обновлён. Загружено {len(rooms_dict)} записей.")
+        data = await region.loader(*args)
+    except Exception as e:
+        logger.error(f"❌ Ошибка загрузки кэша '{region.key}' {args}: {e}", exc_info=True)
+        data = None
+    finally:
+        _cache_load_duration.observe(time.monotonic() - started, region.key)
+
+    if data or (region.cache_empty and data is not None):
+        _cache_loads.inc(region.key, "ok")
+        region.put(args, data)
+        logger.debug(f"ℹ️ Кэш '{region.key}' {args} обновлён.")
+        if region.persist:
+            schedule_snapshot()
+        return data
+
+    _cache_loads.inc(region.key, "empty" if data is not None else "error")
+    logger.warning(f"⚠️ Кэш '{region.key}' {args}: получены пустые данные, старые данные сохранены.")
+    old = region.entries.get(args)
+    return old['data'] if old else data
+
+
+def _start_load(region: CacheRegion, args: Tuple) -> asyncio.Task:
+    """Запускает загрузку, если она ещё не идёт (single-flight)."""
+    task = region.inflight.get(args)
+    if task is None:
+        task = asyncio.create_task(_load(region, args))
+        region.inflight[args] = task
+        task.add_done_callback(lambda _t: region.inflight.pop(args, None))
+    return task
+
+
+async def get_data(key: str, *args) -> Any:
+    """
+    Возвращает данные по ключу, загружая их при промахе.
+    Устаревшие данные отдаются сразу, обновление выполняется в фоне.
+    Одновременные промахи по одной записи разделяют одну загрузку.
+    Возвращаемые данные общие для всех вызывающих — изменять их нельзя.
+    """
+    region = _region(key)
+    entry = region.entries.get(args)
+    if entry is not None and region.is_servable(entry):
+        region.entries.move_to_end(args)
+        if region.is_fresh(entry):
+            _cache_requests.inc(key, "hit")
+        else:
+            _cache_requests.inc(key, "stale")
+            _start_load(region, args)
+        return entry['data']
+
+    _cache_requests.inc(key, "miss")
+    # shield: отмена одного из ожидающих не должна отменять общую загрузку
+    return await asyncio.shield(_start_load(region, args))
+
+
+def get_cached_data(key: str, *args) -> Optional[Any]:
+    """
+    Получает данные из кэша без ожидания загрузки.
+    Если данные устарели, они всё равно возвращаются, а обновление запускается в фоне.
+    :param key: Ключ кэша (например, 'rooms').
+    :return: Данные из кэша или None, если данных нет.
+    """
+    region = _regions.get(key)
+    if region is None:
+        return None
+    entry = region.entries.get(args)
+    if entry is None or not region.is_servable(entry):
+        _cache_requests.inc(key, "miss")
+        return None
+    region.entries.move_to_end(args)
+    if region.is_fresh(entry):
+        _cache_requests.inc(key, "hit")
+    else:
+        _cache_requests.inc(key, "stale")
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Нет запущенного event loop — задачу не создать, обновит периодическая задача
+            logger.debug(f"ℹ️ Данные в кэше по ключу '{key}' устарели, обновление отложено до запуска event loop.")
         else:
-            logger.warning("⚠️ Получен пустой список номеров при обновлении кэша.")
+            logger.debug(f"ℹ️ Данные в кэше по ключу '{key}' устарели, обновляем в фоне.")
+            _start_load(region, args)
+    return entry['data']
+
+
+async def refresh_data(key: str, *args) -> Any:
+    """Принудительно перезагружает запись (с учётом уже идущей загрузки)."""
+    return await asyncio.shield(_start_load(_region(key), args))
+
+
+def invalidate(key: str, *args):
+    """Удаляет запись ключа с указанными аргументами (без аргументов — все записи ключа)."""
+    region = _regions.get(key)
+    if region is None:
+        return
+    if args:
+        region.entries.pop(args, None)
+    else:
+        region.entries.clear()
+
+
+def expire(key: str, *args):
+    """
+    Помечает запись устаревшей, не удаляя её (без аргументов — все записи ключа).
+    Следующее обращение сразу получит старые данные и запустит обновление в фоне.
+    """
+    region = _regions.get(key)
+    if region is None:
+        return
+    stale_since = datetime.now() - timedelta(seconds=region.ttl + 1)
+    for entry_args, entry in region.entries.items():
+        if not args or entry_args == args:
+            entry['timestamp'] = min(entry['timestamp'], stale_since)
+
+
+# --- Загрузчики ---
+
+async def _load_rooms_by_category() -> Dict[str, Dict[str, str]]:
+    """Строит индекс "категория -> номера" из номеров и категорий в кэше."""
+    rooms_dict, categories = await asyncio.gather(get_data('rooms'), get_data('categories'))
+    if not rooms_dict or not categories:
+        return {}
+    return build_category_index(categories, rooms_dict)
+
+
+async def _load_room_index() -> Optional[RoomIndex]:
+    """Строит поисковый индекс названий номеров из номеров в кэше."""
+    rooms_dict = await get_data('rooms')
+    if not rooms_dict:
+        return None
+    names = {room_id: _room_name_from(room_id, rooms_dict) for room_id in rooms_dict}
+    return RoomIndex(names, {**DEFAULT_SYNONYMS, **ROOM_NAME_SYNONYMS})
+
+
+register_loader('rooms', fetch_rooms, ttl=DEFAULT_TTL, persist=True)
+register_loader('categories', fetch_categories, ttl=DEFAULT_TTL, persist=True)
+register_loader('rooms_by_category', _load_rooms_by_category, ttl=DEFAULT_TTL, persist=True)
+register_loader('room_index', _load_room_index, ttl=DEFAULT_TTL)
+# Снимки заездов по диапазону дат: короткий TTL, устаревшие отдаём не дольше 5 минут
+register_loader('bookings', search_checkins, ttl=BOOKINGS_CACHE_TTL, max_entries=32, max_stale=300)
+# Кассовые операции за период: загрузчик выбрасывает исключение при ошибке, поэтому пустой ответ достоверен
+register_loader('cashbox', get_cashbox_transactions_range, ttl=CASHBOX_CACHE_TTL, max_entries=16, cache_empty=True)
+
+
+# --- Сброс данных после записи в Lite PMS ---
+
+def _on_cashbox_changed(day: str, booking_id: Optional[str] = None):
+    """Удаляет кассовые операции за периоды, содержащие день операции, и снимки с изменённой бронью."""
+    for args in [args for args in _regions['cashbox'].entries if args[0] <= day <= args[1]]:
+        invalidate('cashbox', *args)
+    if booking_id:
+        booking_id = str(booking_id)
+        bookings = _regions['bookings']
+        for args, entry in bookings.entries.items():
+            if any(booking.id == booking_id for booking in entry['data']):
+                expire('bookings', *args)
+
+
+# Статус уборки бот из справочника номеров не читает, поэтому запись статуса уборки кэш не сбрасывает:
+# иначе каждая уборка вызывала бы полную перезагрузку getRooms, запись снимка и смену data_version('rooms'),
+# из-за которой перестраиваются готовые тексты /arrival и /today
+events.subscribe(events.CASHBOX_CHANGED, _on_cashbox_changed)
+
+
+async def _load_reference_data():
+    """Обновляет номера и категории (параллельно), затем перестраивает индекс категорий."""
+    rooms_dict, categories = await asyncio.gather(refresh_data('rooms'), refresh_data('categories'))
+    if rooms_dict:
+        logger.info(f"✅ Кэш номеров обновлён. Загружено {len(rooms_dict)} записей.")
+    if categories:
+        logger.info(f"✅ Кэш категорий обновлён. Загружено {len(categories)} записей.")
+    # Производные индексы перестраиваются из обновлённых справочников
+    await asyncio.gather(refresh_data('rooms_by_category'), refresh_data('room_index'))
+
+
+# --- Снимок кэша на диске ---
+# Справочники и окно бронирований сохраняются в сжатый JSON после каждого обновления,
+# а при запуске загружаются до первого запроса к Lite PMS.
+SNAPSHOT_VERSION = 1
+# Задержка перед записью: несколько обновлений подряд дают одну запись на диск
+SNAPSHOT_DEBOUNCE = 2.0
+_snapshot_task: Optional[asyncio.Task] = None
+
+
+def _collect_snapshot() -> dict:
+    regions = {}
+    for key, region in _regions.items():
+        if not region.persist:
+            continue
+        regions[key] = [
+            {"args": list(args), "data": entry['data'], "timestamp": entry['timestamp'].isoformat()}
+            for args, entry in region.entries.items()
+        ]
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": datetime.now().isoformat(),
+        "regions": regions,
+        "booking_store": booking_store.export_state(),
+    }
+
+
+def _write_snapshot(snapshot: dict):
+    # Уникальное имя временного файла: одновременные записи (например, второй экземпляр бота) не портят друг друга
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_SNAPSHOT_PATH.parent, prefix=CACHE_SNAPSHOT_PATH.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        # Атомарная замена: при сбое во время записи старый снимок остаётся целым
+        os.replace(tmp_path, CACHE_SNAPSHOT_PATH)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+async def save_snapshot():
+    """Сохраняет снимок кэша на диск (запись выполняется в отдельном потоке)."""
+    try:
+        snapshot = _collect_snapshot()
+        await asyncio.to_thread(_write_snapshot, snapshot)
+        logger.debug(f"💾 Снимок кэша сохранён в {CACHE_SNAPSHOT_PATH}.")
+    except Exception as e:
+        logger.error(f"❌ Не удалось сохранить снимок кэша: {e}", exc_info=True)
+
+
+async def _debounced_save():
+    global _snapshot_task
+    try:
+        await asyncio.sleep(SNAPSHOT_DEBOUNCE)
+    finally:
+        _snapshot_task = None
+    await save_snapshot()
+
+
+def schedule_snapshot():
+    """Планирует сохранение снимка, если оно ещё не запланировано."""
+    global _snapshot_task
+    if _snapshot_task is not None:
+        return
+    try:
+        _snapshot_task = asyncio.get_running_loop().create_task(_debounced_save())
+    except RuntimeError:
+        # Нет запущенного event loop — снимок сохранится при следующем обновлении
+        pass
+
+
+def load_snapshot() -> bool:
+    """
+    Загружает снимок кэша с диска. Записи получают исходное время загрузки,
+    поэтому устаревшие данные отдаются сразу, но обновляются при первом обращении.
+    :return: True, если снимок найден и загружен.
+    """
+    if not CACHE_SNAPSHOT_PATH.exists():
+        logger.info("ℹ️ Снимок кэша не найден, холодный старт.")
+        return False
+    try:
+        with gzip.open(CACHE_SNAPSHOT_PATH, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
     except Exception as e:
-        logger.error(f"❌ Ошибка при загрузке номеров в кэш: {e}", exc_info=True)
-        # Не очищаем старый кэш при ошибке, если он есть
+        logger.error(f"❌ Не удалось прочитать снимок кэша {CACHE_SNAPSHOT_PATH}: {e}")
+        return False
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"⚠️ Снимок кэша другой версии ({snapshot.get('version')}), пропускаем.")
+        return False
+
+    for key, entries in snapshot.get("regions", {}).items():
+        region = _regions.get(key)
+        if region is None or not region.persist:
+            continue
+        for entry in entries:
+            args = tuple(entry["args"])
+            if args not in region.entries:
+                region.put(args, entry["data"], datetime.fromisoformat(entry["timestamp"]))
+
+    booking_store.restore_state(snapshot.get("booking_store") or {})
+    logger.info(f"📦 Кэш загружен из снимка от {snapshot.get('saved_at')}.")
+    return True
+
+
+# Версия хранилища и окно, по которым последний раз планировался снимок
+_snapshot_store_state: Optional[Tuple] = None
+
+
+def _on_booking_sync():
+    """Обновляет снимок после синхронизации, только если брони или окно изменились."""
+    global _snapshot_store_state
+    state = (booking_store.get_version(), booking_store.get_sync_info()["window"])
+    if state == _snapshot_store_state:
+        return
+    _snapshot_store_state = state
+    schedule_snapshot()
+
+
+booking_store.add_sync_listener(_on_booking_sync)
+
+
+async def _background_reference_refresh():
+    try:
+        await _load_reference_data()
+    except Exception as e:
+        logger.error(f"❌ Ошибка фонового обновления кэша: {e}", exc_info=True)
 
 
 async def initialize_cache():
-    """Инициализирует кэш при запуске приложения."""
+    """
+    Инициализирует кэш при запуске приложения.
+    Если на диске есть снимок с номерами, он загружается сразу, а справочники
+    обновляются из Lite PMS в фоне; иначе ждём загрузки из Lite PMS.
+    """
     logger.info("🔄 Инициализация глобального кэша...")
-    await _load_rooms_into_cache()
+    if load_snapshot() and get_cached_data('rooms'):
+        asyncio.create_task(_background_reference_refresh())
+        logger.info("✅ Кэш восстановлен из снимка, обновление из Lite PMS запущено в фоне.")
+        return
+    await _load_reference_data()
     logger.info("✅ Инициализация глобального кэша завершена.")
 
 
-async def refresh_cache():
-    """Обновляет все данные в кэше."""
-    logger.info("🔄 Обновление глобального кэша...")
-    await _load_rooms_into_cache()
-    logger.info("✅ Глобальный кэш обновлён.")
+def _loaded_since(key: str, since: datetime, *args) -> bool:
+    """Была ли запись ключа успешно загружена после момента since."""
+    entry = _regions[key].entries.get(args)
+    return entry is not None and entry['timestamp'] >= since
 
 
-def get_cached_data(key: str) -> Optional[Any]:
+async def refresh_cache() -> bool:
     """
-    Получает данные из кэша по ключу, если они не устарели.
-    :param key: Ключ кэша (например, 'rooms').
-    :return: Данные из кэша или None, если данных нет или они устарели.
+    Обновляет все справочные данные в кэше.
+    :return: True, если номера и категории получены из Lite PMS.
     """
-    cached_item = _cache.get(key)
-    if not cached_item:
-        return None
+    logger.info("🔄 Обновление глобального кэша...")
+    started = datetime.now()
+    await _load_reference_data()
+    if _loaded_since('rooms', started) and _loaded_since('categories', started):
+        logger.info("✅ Глобальный кэш обновлён.")
+        return True
+    logger.warning("⚠️ Справочники не обновлены, в кэше остались прежние данные.")
+    return False
 
-    data = cached_item.get('data')
-    timestamp = cached_item.get('timestamp')
-    ttl = cached_item.get('ttl', DEFAULT_TTL)
 
-    if not data or not timestamp:
-        return None
+async def refresh_today_cashbox() -> bool:
+    """
+    Обновляет кассовые операции за сегодня, чтобы /dop отвечал без запроса к Lite PMS.
+    :return: True, если операции получены из Lite PMS.
+    """
+    today = date.today().isoformat()
+    started = datetime.now()
+    await refresh_data('cashbox', today, today)
+    return _loaded_since('cashbox', started, today, today)
 
-    if datetime.now() - timestamp > timedelta(seconds=ttl):
-        logger.debug(f"ℹ️ Данные в кэше по ключу '{key}' устарели.")
-        return None
 
-    return data
+# --- Доступ к данным ---
+
+async def get_rooms() -> Dict[str, dict]:
+    """Возвращает {room_id: данные номера} из кэша."""
+    return await get_data('rooms') or {}
 
 
 def get_room_name(room_id: str) -> str:
@@ -81,25 +497,107 @@ def get_room_name(room_id: str) -> str:
     :param room_id: ID номера (строка, т.к. в API LitePMS часто используется строка).
     :return: Название номера или строка вида "ID {room_id}".
     """
-    rooms_dict = get_cached_data('rooms')
-    if rooms_dict and isinstance(rooms_dict, dict):
-        # room_name в API может быть списком, берем первый элемент или саму строку
-        room_name_raw = rooms_dict.get(str(room_id), f"ID {room_id}")
-        if isinstance(room_name_raw, list) and room_name_raw:
-            return room_name_raw[0] # Берем первое имя, если список
-        elif isinstance(room_name_raw, str):
-            return room_name_raw
-        else:
-            return f"ID {room_id}"
-    return f"ID {room_id}"
+    rooms_dict = get_cached_data('rooms') or {}
+    return _room_name_from(str(room_id), rooms_dict)
 
 
-# --- Функция для периодического обновления ---
-async def periodic_cache_refresh(interval: int = DEFAULT_TTL):
+async def get_room_index() -> RoomIndex:
+    """Возвращает поисковый индекс названий номеров (пустой, если номера ещё не загружены)."""
+    return await get_data('room_index') or RoomIndex({})
+
+
+async def get_rooms_by_categories(category_names: List[str]) -> Dict[str, str]:
+    """Возвращает {room_id: название} для номеров указанных категорий из индекса в кэше."""
+    index = await get_data('rooms_by_category') or {}
+    return select_rooms_by_categories(index, category_names)
+
+
+async def get_bookings_snapshot(
+    from_date: str, to_date: str, store_only: bool = False
+) -> Tuple[List[Booking], Optional[Tuple]]:
     """
-    Бесконечно обновляет кэш с заданным интервалом.
-    :param interval: Интервал обновления в секундах.
+    Возвращает заезды за период и отпечаток снимка, из которого они взяты.
+    Отпечаток меняется только вместе с данными; None — данные не из снимка (кэшировать по ним нельзя).
+    :param store_only: Только из локального хранилища (в том числе устаревшего), без запроса к Lite PMS.
+                       Вызывающий сам проверяет, что период покрыт хранилищем.
+    """
+    # Если период покрыт локальным хранилищем — отвечаем из него без запроса к Lite PMS
+    if booking_store.covers(from_date, to_date, allow_stale=store_only):
+        return booking_store.get_checkins(from_date, to_date), ("store", booking_store.get_version())
+
+    if store_only:
+        return [], None
+    bookings = await get_data('bookings', from_date, to_date)
+    if not bookings and booking_store.covers(from_date, to_date, allow_stale=True):
+        # Lite PMS не ответил — лучше устаревшие данные хранилища, чем пустой список
+        return booking_store.get_checkins(from_date, to_date), ("store", booking_store.get_version())
+    entry = _regions['bookings'].entries.get((from_date, to_date))
+    if bookings and entry is not None and entry['data'] is bookings:
+        return bookings, ("pms", from_date, to_date, entry['timestamp'].isoformat())
+    return bookings or [], None
+
+
+async def get_bookings(from_date: str, to_date: str) -> List[Booking]:
     """
-    while True:
-        await asyncio.sleep(interval)
-        await refresh_cache()
+    Возвращает заезды за период из короткоживущего снимка.
+    Если период покрыт локальным хранилищем бронирований, ответ берётся из него.
+    Одновременные вызовы с одинаковым диапазоном разделяют один запрос к Lite PMS.
+    Возвращаемый список общий для всех вызывающих — изменять его нельзя.
+    :param from_date: Начало периода (YYYY-MM-DD).
+    :param to_date: Конец периода (YYYY-MM-DD).
+    """
+    bookings, _ = await get_bookings_snapshot(from_date, to_date)
+    return bookings
+
+
+def data_version(key: str, *args) -> Optional[str]:
+    """Время загрузки записи кэша как её версия (None, если записи нет)."""
+    region = _regions.get(key)
+    entry = region.entries.get(args) if region else None
+    return entry['timestamp'].isoformat() if entry else None
+
+
+# --- Готовые тексты ответов ---
+# Один и тот же ответ (например, /arrival на сегодня) нужен многим сотрудникам подряд.
+# Текст строится один раз и отдаётся из памяти, пока не изменится отпечаток исходных данных.
+RENDERED_MAX_ENTRIES = 64
+_rendered: "OrderedDict[Tuple, Tuple[Any, str]]" = OrderedDict()
+_rendered_requests = Counter("rendered_requests_total", "Готовые тексты ответов", ("command", "result"))
+
+
+def get_rendered(key: Tuple, fingerprint: Any, render: Callable[[], str]) -> str:
+    """
+    Возвращает текст ответа, построенный render(), из памяти, если отпечаток данных не изменился.
+    :param key: (команда, дата, ...) — что именно отображается.
+    :param fingerprint: Отпечаток исходных данных; None — строить заново и не сохранять.
+    """
+    if fingerprint is None:
+        _rendered_requests.inc(key[0], "uncached")
+        return render()
+    cached = _rendered.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        _rendered.move_to_end(key)
+        _rendered_requests.inc(key[0], "hit")
+        return cached[1]
+    _rendered_requests.inc(key[0], "miss")
+    text = render()
+    _rendered[key] = (fingerprint, text)
+    _rendered.move_to_end(key)
+    while len(_rendered) > RENDERED_MAX_ENTRIES:
+        _rendered.popitem(last=False)
+    return text
+
+
+def get_cached_cashbox(from_date: str, to_date: str) -> Optional[List[dict]]:
+    """Кассовые операции за период, если они уже есть в кэше, иначе None (без запроса к Lite PMS)."""
+    return get_cached_data('cashbox', from_date, to_date)
+
+
+async def get_cashbox(from_date: str, to_date: str) -> Optional[List[dict]]:
+    """
+    Возвращает кассовые операции за период (YYYY-MM-DD) из кэша.
+    Возвращаемый список общий для всех вызывающих — изменять его нельзя.
+    :return: Список операций или None, если Lite PMS не ответил.
+    """
+    return await get_data('cashbox', from_date, to_date)
+
@@ -1,6 +1,7 @@
 # bot/config.py
 import os
 import logging
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -33,6 +34,7 @@ except (ValueError, TypeError):
     CLEANING_REPORTS_CHANNEL_ID = None
 
 # Список зон для отчетов об уборке из .env
+# Формат: "Название:room_id;Название2:room_id1,room_id2" (зона может включать несколько номеров)
 CLEANING_ZONES_RAW = os.getenv("CLEANING_ZONES", "")
 CLEANING_ZONES = []
 if CLEANING_ZONES_RAW:
@@ -58,8 +60,135 @@ ARRIVAL_CATEGORIES_RAW = os.getenv("ARRIVAL_CATEGORIES", "")
 ARRIVAL_CATEGORIES = [cat.strip() for cat in ARRIVAL_CATEGORIES_RAW.split(",") if cat.strip()]
 
 # Константы
-BASE_URL = "https://litepms.ru/api"
+# Можно переопределить, например, для локального стенда tools/fake_litepms.py
+BASE_URL = os.getenv("LITEPMS_BASE_URL", "https://litepms.ru/api").rstrip("/")
 DB_PATH = Path("tasks.db")
 SPA_ROOM_ID = "49518"
+# Все помещения СПА (/spa, /spa_free, /today, занятость), через запятую; по умолчанию — только SPA_ROOM_ID
+SPA_ROOM_IDS = [room_id.strip() for room_id in os.getenv("SPA_ROOM_IDS", SPA_ROOM_ID).split(",") if room_id.strip()]
 DOPY_INCOME_ID = "9534"
 FAQ_PATH = Path("faq.json")
+# Снимок кэша на диске для быстрого старта
+CACHE_SNAPSHOT_PATH = Path(os.getenv("CACHE_SNAPSHOT_PATH", "cache_snapshot.json.gz"))
+
+# Время жизни снимка бронирований (в секундах)
+BOOKINGS_CACHE_TTL = int(os.getenv("BOOKINGS_CACHE_TTL", "60"))
+
+# Время жизни кассовых операций за период в кэше (в секундах); после записи в кассу сбрасывается сразу
+CASHBOX_CACHE_TTL = int(os.getenv("CASHBOX_CACHE_TTL", "300"))
+
+# Локальное хранилище бронирований: окно (в днях от сегодня) и частота синхронизации
+BOOKING_STORE_DAYS_BACK = int(os.getenv("BOOKING_STORE_DAYS_BACK", "3"))
+BOOKING_STORE_DAYS_AHEAD = int(os.getenv("BOOKING_STORE_DAYS_AHEAD", "30"))
+# Самое длинное проживание, ночей. searchBooking ищет по дате заезда, поэтому окно начинается
+# не позже чем за столько дней: иначе выезды и проживающие сегодня теряют гостей, заехавших раньше окна
+BOOKING_MAX_STAY_NIGHTS = int(os.getenv("BOOKING_MAX_STAY_NIGHTS", "30"))
+# Каждые BOOKING_STORE_SYNC_INTERVAL секунд обновляются только ближние заезды (сегодня и ещё
+# BOOKING_STORE_NEAR_DAYS дней), всё окно — раз в BOOKING_STORE_FULL_SYNC_INTERVAL секунд и при смене дня
+BOOKING_STORE_SYNC_INTERVAL = int(os.getenv("BOOKING_STORE_SYNC_INTERVAL", "60"))
+BOOKING_STORE_NEAR_DAYS = int(os.getenv("BOOKING_STORE_NEAR_DAYS", "6"))
+BOOKING_STORE_FULL_SYNC_INTERVAL = int(os.getenv("BOOKING_STORE_FULL_SYNC_INTERVAL", "600"))
+# Через сколько секунд без успешной синхронизации данные хранилища считаются устаревшими
+BOOKING_STORE_MAX_AGE = int(os.getenv("BOOKING_STORE_MAX_AGE", "900"))
+
+# --- Устойчивость запросов к Lite PMS ---
+# Повторы для идемпотентных методов (экспоненциальная задержка с джиттером)
+LITEPMS_RETRY_ATTEMPTS = int(os.getenv("LITEPMS_RETRY_ATTEMPTS", "3"))
+LITEPMS_RETRY_BASE_DELAY = float(os.getenv("LITEPMS_RETRY_BASE_DELAY", "0.5"))
+LITEPMS_RETRY_MAX_DELAY = float(os.getenv("LITEPMS_RETRY_MAX_DELAY", "8"))
+# Circuit breaker: после N сбоев подряд запросы не отправляются RESET секунд
+LITEPMS_BREAKER_FAILURES = int(os.getenv("LITEPMS_BREAKER_FAILURES", "5"))
+LITEPMS_BREAKER_RESET = float(os.getenv("LITEPMS_BREAKER_RESET", "30"))
+# Ограничение частоты запросов (token bucket) для каждого метода: запросов в секунду и размер всплеска.
+# Переопределение для отдельных методов: LITEPMS_RATE_LIMITS="searchBooking:2;getRooms:0.5"
+LITEPMS_RATE_LIMIT = float(os.getenv("LITEPMS_RATE_LIMIT", "5"))
+LITEPMS_RATE_BURST = int(os.getenv("LITEPMS_RATE_BURST", "10"))
+LITEPMS_RATE_LIMITS = {}
+for _rate_part in os.getenv("LITEPMS_RATE_LIMITS", "").split(";"):
+    _rate_part = _rate_part.strip()
+    if not _rate_part:
+        continue
+    try:
+        _method, _rate = _rate_part.rsplit(":", 1)
+        LITEPMS_RATE_LIMITS[_method.strip()] = float(_rate)
+    except ValueError:
+        logger.error(f"❌ Неверный формат LITEPMS_RATE_LIMITS в .env: {_rate_part}")
+
+# --- Пул соединений к Lite PMS ---
+LITEPMS_POOL_LIMIT = int(os.getenv("LITEPMS_POOL_LIMIT", "20"))
+LITEPMS_POOL_LIMIT_PER_HOST = int(os.getenv("LITEPMS_POOL_LIMIT_PER_HOST", "10"))
+LITEPMS_KEEPALIVE_TIMEOUT = float(os.getenv("LITEPMS_KEEPALIVE_TIMEOUT", "30"))
+LITEPMS_DNS_TTL = int(os.getenv("LITEPMS_DNS_TTL", "300"))
+LITEPMS_CONNECT_TIMEOUT = float(os.getenv("LITEPMS_CONNECT_TIMEOUT", "5"))
+LITEPMS_READ_TIMEOUT = float(os.getenv("LITEPMS_READ_TIMEOUT", "20"))
+
+# Сколько запросов setRoomCleaningStatus выполнять одновременно при массовом обновлении
+CLEANING_BULK_CONCURRENCY = int(os.getenv("CLEANING_BULK_CONCURRENCY", "5"))
+
+# --- Очередь отложенной записи в Lite PMS (outbox) ---
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "5"))
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "10"))
+
+# Длинные периоды запрашиваются частями: размер части в днях и число параллельных запросов
+RANGE_CHUNK_DAYS = int(os.getenv("RANGE_CHUNK_DAYS", "7"))
+RANGE_FETCH_CONCURRENCY = int(os.getenv("RANGE_FETCH_CONCURRENCY", "4"))
+
+# Дополнительные синонимы для поиска номеров по названию: "домик=дом;баня=сауна"
+ROOM_NAME_SYNONYMS = {}
+for _syn_part in os.getenv("ROOM_NAME_SYNONYMS", "").split(";"):
+    if "=" in _syn_part:
+        _word, _replacement = _syn_part.split("=", 1)
+        if _word.strip() and _replacement.strip():
+            ROOM_NAME_SYNONYMS[_word.strip().lower()] = _replacement.strip().lower()
+
+# --- Метрики (формат Prometheus) ---
+# Локальный HTTP-эндпоинт http://METRICS_HOST:METRICS_PORT/metrics; METRICS_PORT=0 отключает его
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# --- Планировщик фоновых обновлений ---
+# Периодичность (в секундах): справочники номеров и категорий, кассовые операции за сегодня.
+# Окно бронирований обновляется с периодичностью BOOKING_STORE_SYNC_INTERVAL.
+REFERENCE_REFRESH_INTERVAL = int(os.getenv("REFERENCE_REFRESH_INTERVAL", "86400"))
+CASHBOX_REFRESH_INTERVAL = int(os.getenv("CASHBOX_REFRESH_INTERVAL", "300"))
+# Разброс времени запуска (доля интервала) и самая длинная задержка повтора после неудач:
+# повторы идут не чаще обычного интервала и реже с каждой неудачей, но не реже чем раз в столько секунд
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+SCHEDULER_RETRY_MAX_DELAY = float(os.getenv("SCHEDULER_RETRY_MAX_DELAY", "900"))
+
+# --- Утренние рассылки (подписка через /subscribe) ---
+# Время отправки: "arrivals=07:30;spa=07:30"
+DIGEST_SCHEDULE = {}
+for _digest_part in os.getenv("DIGEST_SCHEDULE", "arrivals=07:30;spa=07:30").split(";"):
+    if "=" not in _digest_part:
+        continue
+    _digest_name, _digest_time = (part.strip() for part in _digest_part.split("=", 1))
+    try:
+        time.strptime(_digest_time, "%H:%M")
+        DIGEST_SCHEDULE[_digest_name] = _digest_time
+    except ValueError:
+        logger.error(f"❌ Неверное время рассылки в DIGEST_SCHEDULE: {_digest_part}")
+# Если бот был недоступен, рассылка отправляется не позже чем через столько минут после назначенного времени
+DIGEST_MAX_DELAY_MINUTES = int(os.getenv("DIGEST_MAX_DELAY_MINUTES", "120"))
+# Ограничение Telegram: не больше ~30 сообщений в секунду на бота
+DIGEST_SEND_RATE = float(os.getenv("DIGEST_SEND_RATE", "20"))
+DIGEST_SEND_ATTEMPTS = int(os.getenv("DIGEST_SEND_ATTEMPTS", "3"))
+
+# --- Уведомления об изменениях бронирований ---
+# Роли, которым приходят изменения (пусто — уведомления отключены)
+BOOKING_NOTIFY_ROLES = [role.strip() for role in os.getenv("BOOKING_NOTIFY_ROLES", "manager,admin,housekeeper").split(",") if role.strip()]
+# Сообщать об изменениях броней с заездом от сегодня до сегодня + N дней
+BOOKING_NOTIFY_DAYS_AHEAD = int(os.getenv("BOOKING_NOTIFY_DAYS_AHEAD", "1"))
+
+# --- Свободное время СПА (/spa_free) ---
+SPA_OPEN_TIME = os.getenv("SPA_OPEN_TIME", "10:00")
+SPA_CLOSE_TIME = os.getenv("SPA_CLOSE_TIME", "22:00")
+for _spa_time in (SPA_OPEN_TIME, SPA_CLOSE_TIME):
+    try:
+        time.strptime(_spa_time, "%H:%M")
+    except ValueError:
+        raise ValueError(f"❌ Неверное время работы СПА (SPA_OPEN_TIME / SPA_CLOSE_TIME): {_spa_time}")
+# Длительность сеанса по умолчанию, минут
+SPA_SLOT_MINUTES = int(os.getenv("SPA_SLOT_MINUTES", "60"))
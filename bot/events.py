@@ -0,0 +1,29 @@
+# bot/events.py
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# --- События изменения данных в Lite PMS ---
+# Пути записи публикуют событие после успешного ответа Lite PMS,
+# подписчики (например, кэш) сбрасывают только затронутые данные.
+
+# Добавлена кассовая операция: day (YYYY-MM-DD), booking_id (или None)
+CASHBOX_CHANGED = "cashbox_changed"
+
+_subscribers: Dict[str, List[Callable[..., None]]] = defaultdict(list)
+
+
+def subscribe(event: str, handler: Callable[..., None]):
+    """Подписывает обработчик на событие. Обработчик вызывается синхронно с данными события."""
+    _subscribers[event].append(handler)
+
+
+def publish(event: str, **payload):
+    """Вызывает всех подписчиков события. Ошибка подписчика не влияет на остальных и на запись."""
+    for handler in list(_subscribers.get(event, ())):
+        try:
+            handler(**payload)
+        except Exception as e:
+            logger.error(f"❌ Ошибка обработчика события {event}: {e}", exc_info=True)
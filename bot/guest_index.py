@@ -0,0 +1,90 @@
+# bot/guest_index.py
+import logging
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Set
+
+from bot import booking_store
+from bot.api.booking import Booking
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text) -> str:
+    """Приводит имя к виду для поиска: нижний регистр, ё -> е, дефисы как пробелы."""
+    return str(text or "").strip().lower().replace("ё", "е").replace("-", " ")
+
+
+def _words(booking: Booking) -> Set[str]:
+    return set(normalize(f"{booking.surname} {booking.name}").split())
+
+
+class GuestIndex:
+    """
+    Префиксный индекс фамилий и имён гостей: отсортированный список пар (слово, позиция брони).
+    Все слова с префиксом лежат в списке подряд, поэтому поиск — двоичный поиск
+    начала диапазона и просмотр только совпадений: O(log n + k).
+    """
+
+    def __init__(self, bookings: Iterable[Booking]):
+        self.bookings: List[Booking] = list(bookings)
+        entries = sorted((word, pos) for pos, booking in enumerate(self.bookings) for word in _words(booking))
+        self.words: List[str] = [word for word, _ in entries]
+        self.positions: List[int] = [pos for _, pos in entries]
+
+    def __len__(self) -> int:
+        return len(self.bookings)
+
+    def _match_prefix(self, prefix: str) -> Set[int]:
+        found = set()
+        i = bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            found.add(self.positions[i])
+            i += 1
+        return found
+
+    def search(self, query: str) -> List[Booking]:
+        """
+        Брони, у которых каждое слово запроса — начало фамилии или имени гостя.
+        'иванов' найдёт «Иванов», «Иванова»; 'петров ив' — «Петров Иван».
+        :return: Брони по дате заезда.
+        """
+        found: Optional[Set[int]] = None
+        for word in normalize(query).split():
+            matched = self._match_prefix(word)
+            found = matched if found is None else found & matched
+            if not found:
+                return []
+        if not found:
+            return []
+        return sorted((self.bookings[pos] for pos in found), key=lambda b: (b.day_in, b.time_in))
+
+
+# Индекс строится по всему окну хранилища бронирований и перестраивается после синхронизации,
+# если брони изменились (по версии хранилища)
+_index: Optional[GuestIndex] = None
+_index_version: Optional[int] = None
+
+
+def _rebuild_if_changed():
+    global _index, _index_version
+    version = booking_store.get_version()
+    if _index is not None and version == _index_version:
+        return
+    _index = GuestIndex(booking_store.get_all_bookings())
+    _index_version = version
+    logger.debug(f"ℹ️ Индекс гостей перестроен: {len(_index)} броней, {len(_index.words)} слов.")
+
+
+booking_store.add_sync_listener(_rebuild_if_changed)
+
+
+def get_guest_index() -> Optional[GuestIndex]:
+    """
+    Индекс гостей по окну хранилища бронирований.
+    :return: Индекс или None, если хранилище ещё не синхронизировано.
+    """
+    if booking_store.get_sync_info()["window"] is None:
+        return None
+    # После восстановления из снимка синхронизации ещё не было — строим при первом запросе
+    _rebuild_if_changed()
+    return _index
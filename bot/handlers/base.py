@@ -6,6 +6,9 @@ from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 
 from bot.utils.permissions import get_user_role
+from bot.api.litepms import get_pool_stats
+from bot.utils.metrics import render_summary
+from bot.scheduler import scheduler
 #from bot.api.litepms import fetch_rooms
 #from bot.cache import get_room_name
 
@@ -121,6 +124,63 @@ async def cmd_show_admin_menu(message: types.Message):
     )
 
 
+# --- Статистика пула соединений Lite PMS (только для manager) ---
+
+@router.message(Command("pool"))
+async def cmd_pool_stats(message: types.Message):
+    """Показывает состояние пула соединений к Lite PMS."""
+    if get_user_role(message.from_user.id) != "manager":
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+
+    stats = get_pool_stats()
+    await message.answer(
+        "🌐 Пул соединений Lite PMS\n\n"
+        f"Активные: {stats['active']} / {stats['limit_per_host']} на хост (всего {stats['limit']})\n"
+        f"Простаивают: {stats['idle']}\n"
+        f"Ожиданий свободного соединения: {stats['queued']}\n"
+        f"Среднее ожидание: {stats['wait_avg'] * 1000:.0f} мс, максимум: {stats['wait_max'] * 1000:.0f} мс\n"
+        f"Новых соединений: {stats['created']}, переиспользовано: {stats['reused']}"
+    )
+
+
+# --- Метрики кэша и вызовов Lite PMS (только для manager) ---
+
+@router.message(Command("metrics"))
+async def cmd_metrics(message: types.Message):
+    """Показывает счётчики кэша, время вызовов Lite PMS и возраст данных."""
+    if get_user_role(message.from_user.id) != "manager":
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+
+    text = "📈 Метрики бота\n\n" + render_summary()
+    for i in range(0, len(text), 4000):
+        await message.answer(text[i:i + 4000])
+
+
+# --- Состояние фоновых обновлений (только для manager) ---
+
+@router.message(Command("jobs"))
+async def cmd_jobs(message: types.Message):
+    """Показывает, когда каждая фоновая задача запускалась, сколько длилась и когда запустится снова."""
+    if get_user_role(message.from_user.id) != "manager":
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        return
+
+    lines = ["⏱ Фоновые обновления\n"]
+    for job in scheduler.get_status():
+        if job["running"]:
+            state = "выполняется"
+        elif job["last_started"] is None:
+            state = "ещё не запускалась"
+        else:
+            result = "✅" if job["last_ok"] else f"❌ {job['last_error']} (неудач подряд: {job['failures']})"
+            state = f"{job['last_started'].strftime('%d.%m %H:%M:%S')}, {job['last_duration']:.1f} с {result}"
+        next_run = f", следующий запуск {job['next_run'].strftime('%d.%m %H:%M:%S')}" if job["next_run"] else ""
+        lines.append(f"• {job['name']} (каждые {job['interval']:.0f} с): {state}{next_run}")
+    await message.answer("\n".join(lines))
+
+
 # --- Кнопка "Назад" ---
 
 @router.message(lambda message: message.text == "🔙 Назад")
@@ -1,28 +1,32 @@
 # bot/handlers/bookings.py
 import logging
 from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 from aiogram import Router, types
-from aiogram.filters import Command, StateFilter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, StateFilter
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
-from aiogram.utils.keyboard import ReplyKeyboardBuilder
-
-from bot.config import SPA_ROOM_ID, CLEANING_ZONES, ARRIVAL_CATEGORIES
-from bot.api.litepms import search_checkins, format_guest_name, is_active_status, fetch_rooms, get_room_name, fetch_categories, fetch_rooms_by_categories
+from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
+
+from bot.config import SPA_ROOM_IDS, SPA_SLOT_MINUTES, CLEANING_ZONES, ARRIVAL_CATEGORIES
+from bot.api.booking import Booking, format_time
+from bot.api.litepms import format_guest_name, get_room_name
+from bot.cache import (
+    get_bookings, get_bookings_snapshot, get_rooms, get_room_index, get_rooms_by_categories,
+    get_rendered, data_version, get_data, get_room_name as get_cached_room_name,
+)
+from bot import booking_store
+from bot.booking_store import stale_note, partial_note, complete_from, get_day_summary, get_version as booking_store_version
+from bot.occupancy import get_occupancy, popcount
+from bot.spa_slots import get_free_slots
+from bot.guest_index import get_guest_index
 # Импорт проверки прав
 from bot.utils.permissions import can_access_command
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-# Глобальный кэш номеров
-ROOMS_CACHE = {}
-
-async def load_rooms_cache():
-    """Загружает кэш номеров при запуске."""
-    global ROOMS_CACHE
-    ROOMS_CACHE = await fetch_rooms()
-    logger.info(f"Загружено {len(ROOMS_CACHE)} номеров в кэш")
-
 # --- /arrival2 ---
 @router.message(Command("arrival2"))
 async def cmd_arrival2(message: types.Message):
@@ -34,39 +38,38 @@ async def cmd_arrival2(message: types.Message):
         return
 
     today = date.today()
-    tomorrow = today + timedelta(days=1)
-    bookings = await search_checkins(today.isoformat(), tomorrow.isoformat())
-
-    grouped = {today.isoformat(): [], tomorrow.isoformat(): []}
-    for b in bookings:
-        if is_active_status(b["status_id"]):
-            d = b["date_in"][:10]
-            if d in grouped:
-                grouped[d].append(b)
+    text = await build_arrival2_text(today)
+    await message.answer(text + stale_note(), reply_markup=await _page_keyboard("arrival2", today))
 
-    parts = []
-    for d in [today, tomorrow]:
-        label = "Сегодня" if d == today else "Завтра"
-        entries = grouped[d.isoformat()]
-        if entries:
-            lines = []
-            for b in entries:
-                guest = format_guest_name(b)
-                # Используем кэш для получения названия номера
-                from bot.cache import get_room_name
-                room_name = ROOMS_CACHE.get(str(b['room_id']), f"ID {b['room_id']}")
-                total_guests = int(b.get('person', 1)) + int(b.get('person_add', 0))
-                lines.append(f"• {room_name} — {guest} ({total_guests} гостя)")
-            parts.append(f"📅 {label}, {d.strftime('%d.%m')}:\n" + "\n".join(lines))
-        else:
-            parts.append(f"📅 {label}, {d.strftime('%d.%m')}:\n• Нет заездов")
 
-    await message.answer("\n\n".join(parts))
+async def build_arrival2_text(from_day: date, category: Optional[str] = None, store_only: bool = False) -> str:
+    """
+    Текст заездов во все номера (или в номера одной категории) на from_day и следующий день.
+    :param store_only: Брать брони только из локального хранилища (листание кнопками).
+    """
+    today = date.today()
+    to_day = from_day + timedelta(days=1)
+    bookings, fingerprint = await get_bookings_snapshot(from_day.isoformat(), to_day.isoformat(), store_only)
+    rooms = await get_rooms()
+    category_rooms = await get_rooms_by_categories([category]) if category else None
+
+    if fingerprint is not None:
+        fingerprint += (data_version('rooms'), data_version('rooms_by_category') if category else None)
+    return get_rendered(
+        ("arrival2", today.isoformat(), from_day.isoformat(), category),
+        fingerprint,
+        lambda: _render_arrivals(
+            bookings if category_rooms is None else [b for b in bookings if b.room_id in category_rooms],
+            lambda room_id: get_room_name(room_id, rooms),
+            [from_day, to_day],
+            today,
+        ),
+    )
 
 
 # --- /arrival ---
 @router.message(Command("arrival"))
-async def cmd_arrival(message: types.Message):
+async def cmd_arrival(message: types.Message, command: Optional[CommandObject] = None):
     """Отправляет список гостей, заезжающих сегодня и завтра, только для указанных категорий."""
     # Проверка прав доступа
     if not can_access_command(message.from_user.id, "/arrival"):
@@ -79,48 +82,162 @@ async def cmd_arrival(message: types.Message):
         logger.warning("Список категорий для /arrival (ARRIVAL_CATEGORIES) пуст.")
         return
 
-    # Получаем номера только для указанных категорий
-    target_rooms = await fetch_rooms_by_categories(ARRIVAL_CATEGORIES)
-    if not target_rooms:
+    # /arrival — сегодня и завтра, /arrival 2026-10-20..2026-10-27 — период.
+    # Кнопка меню «🏨 Заезды» вызывает обработчик без command — всегда сегодня и завтра.
+    today = date.today()
+    period_arg = command.args.strip() if command is not None and command.args else ""
+    if period_arg:
+        period = _parse_period(period_arg)
+        if period is None:
+            await message.answer(
+                "❌ Неверный период.\n"
+                f"Используйте: `/arrival 2026-10-20..2026-10-27` (не длиннее {MAX_ARRIVAL_PERIOD_DAYS} дн.)",
+                parse_mode="Markdown"
+            )
+            return
+        from_day, to_day = period
+    else:
+        from_day, to_day = today, today + timedelta(days=1)
+
+    text = await build_arrival_text(from_day, to_day, with_occupancy=bool(period_arg))
+    if text is None:
         await message.answer(f"❌ Не найдены номера в категориях: {', '.join(ARRIVAL_CATEGORIES)}")
         logger.warning(f"Не найдены номера в категориях: {ARRIVAL_CATEGORIES}")
         return
+    if not period_arg and len(text) <= 4000:
+        # Сегодня и завтра — с кнопками листания дней и фильтром категорий
+        await message.answer(text + stale_note(), reply_markup=await _page_keyboard("arrival", today))
+        return
+    for i in range(0, len(text), 4000):
+        await message.answer(text[i:i + 4000] + (stale_note() if i + 4000 >= len(text) else ""))
+
+
+async def build_arrival_text(
+    from_day: date,
+    to_day: date,
+    with_occupancy: bool = False,
+    categories: Optional[List[str]] = None,
+    store_only: bool = False,
+) -> Optional[str]:
+    """
+    Текст заездов в номера категорий ARRIVAL_CATEGORIES за период (без пометки об устаревших данных).
+    Используется командой /arrival и утренней рассылкой.
+    :param with_occupancy: Добавить к дням занятость целевых номеров.
+    :param categories: Подмножество категорий вместо ARRIVAL_CATEGORIES (фильтр кнопками).
+    :param store_only: Брать брони только из локального хранилища (листание кнопками).
+    :return: Текст или None, если номера категорий не найдены.
+    """
+    categories = categories or ARRIVAL_CATEGORIES
+    target_rooms = await get_rooms_by_categories(categories)
+    if not target_rooms:
+        return None
 
     today = date.today()
-    tomorrow = today + timedelta(days=1)
-    bookings = await search_checkins(today.isoformat(), tomorrow.isoformat())
-
-    # Фильтруем только активные заезды в целевых номерах
-    filtered_bookings = []
-    for b in bookings:
-        if is_active_status(b["status_id"]) and str(b["room_id"]) in target_rooms:
-            filtered_bookings.append(b)
-
-    # Сортируем по названию номера
-    filtered_bookings.sort(key=lambda x: target_rooms.get(str(x["room_id"]), ""))
+    days = [from_day + timedelta(days=i) for i in range((to_day - from_day).days + 1)]
+    bookings, fingerprint = await get_bookings_snapshot(from_day.isoformat(), to_day.isoformat(), store_only)
+
+    # Для периода — занятость целевых номеров по дням из матрицы занятости
+    occupancy = None
+    if with_occupancy:
+        matrix = await get_occupancy()
+        if matrix is not None and matrix.covers(from_day, to_day):
+            mask = matrix.room_mask(target_rooms)
+            total = popcount(mask)
+            exact_from = complete_from()
+            occupancy = {d: (matrix.occupied_count(d, mask), total, exact_from is None or d >= exact_from) for d in days}
+
+    if fingerprint is not None:
+        # Занятость считается по хранилищу бронирований — его версия входит в отпечаток
+        fingerprint += (data_version('rooms_by_category'), booking_store_version() if occupancy else None)
+    return get_rendered(
+        ("arrival", today.isoformat(), from_day.isoformat(), to_day.isoformat(), tuple(sorted(categories))),
+        fingerprint,
+        lambda: _render_arrivals(
+            # Только заезды в целевых номерах
+            [b for b in bookings if b.room_id in target_rooms],
+            lambda room_id: target_rooms.get(room_id, f"ID {room_id}"),
+            days,
+            today,
+            sort_by_room=True,
+            occupancy=occupancy,
+        ),
+    )
+
+
+# Самый длинный период для /arrival
+MAX_ARRIVAL_PERIOD_DAYS = 31
+
+
+def _parse_period(text: str) -> Optional[Tuple[date, date]]:
+    """'2026-10-20..2026-10-27' или '2026-10-20' -> (начало, конец); None, если формат неверный или период слишком длинный."""
+    start, _, end = text.strip().partition("..")
+    try:
+        from_day = date.fromisoformat(start.strip())
+        to_day = date.fromisoformat(end.strip()) if end.strip() else from_day
+    except ValueError:
+        return None
+    if to_day < from_day:
+        from_day, to_day = to_day, from_day
+    if (to_day - from_day).days >= MAX_ARRIVAL_PERIOD_DAYS:
+        return None
+    return from_day, to_day
+
+
+# --- /occupancy ---
+@router.message(Command("occupancy"))
+async def cmd_occupancy(message: types.Message):
+    """Показывает занятость номеров на неделю: итоги по дням и сетку номер × день."""
+    if not can_access_command(message.from_user.id, "/occupancy"):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        logger.warning(f"Пользователь {message.from_user.id} попытался выполнить /occupancy без прав.")
+        return
 
-    grouped: dict[str, list] = {today.isoformat(): [], tomorrow.isoformat(): []}
-    for b in filtered_bookings:
-        d = b["date_in"][:10]
-        if d in grouped:
-            grouped[d].append(b)
+    # /occupancy — неделя с сегодняшнего дня, /occupancy 2026-10-20 — неделя с указанной даты
+    today = date.today()
+    args = message.text.split(maxsplit=1)
+    try:
+        start = date.fromisoformat(args[1].strip()) if len(args) > 1 else today
+    except ValueError:
+        await message.answer("❌ Неверная дата. Используйте: `/occupancy 2026-10-20`", parse_mode="Markdown")
+        return
+    days = [start + timedelta(days=i) for i in range(7)]
 
-    parts = []
-    for d in [today, tomorrow]:
-        label = "Сегодня" if d == today else "Завтра"
-        entries = grouped[d.isoformat()]
-        if entries:
-            lines = []
-            for b in entries:
-                guest = format_guest_name(b)
-                room_name = target_rooms.get(str(b['room_id']), f"ID {b['room_id']}")
-                total_guests = int(b.get('person', 1)) + int(b.get('person_add', 0))
-                lines.append(f"• {room_name} — {guest} ({total_guests} гостя)")
-            parts.append(f"📅 {label}, {d.strftime('%d.%m')}:\n" + "\n".join(lines))
-        else:
-            parts.append(f"📅 {label}, {d.strftime('%d.%m')}:\n• Нет заездов")
+    matrix = await get_occupancy()
+    if matrix is None:
+        await message.answer("⚠️ Бронирования ещё не загружены, попробуйте через минуту.")
+        return
+    if not matrix.covers(days[0], days[-1]):
+        await message.answer(
+            f"❌ Занятость доступна с {matrix.start.strftime('%d.%m')} по {matrix.end.strftime('%d.%m')}."
+        )
+        return
 
-    await message.answer("\n\n".join(parts))
+    # Сетка — по номерам категорий /arrival, если они настроены, иначе по всем номерам
+    rooms = await get_rooms()
+    if ARRIVAL_CATEGORIES:
+        grid_rooms = await get_rooms_by_categories(ARRIVAL_CATEGORIES)
+    else:
+        grid_rooms = {room_id: get_room_name(room_id, rooms) for room_id in matrix.room_ids}
+    total = len(matrix.room_ids)
+
+    lines = [f"🛏 Занятость {days[0].strftime('%d.%m')} – {days[-1].strftime('%d.%m')}\n"]
+    exact_from = complete_from()
+    for d in days:
+        occupied = matrix.occupied_count(d)
+        approx = "" if exact_from is None or d >= exact_from else "≈"
+        lines.append(
+            f"{_day_label(d, today)}, {d.strftime('%d.%m')}: занято {approx}{occupied} из {total}, "
+            f"свободно {approx}{total - occupied}"
+        )
+    lines.append("\n" + " ".join(WEEKDAYS[d.weekday()] for d in days))
+    for room_id, name in sorted(grid_rooms.items(), key=lambda item: item[1]):
+        row = " ".join("■" if matrix.is_occupied(room_id, d) else "□" for d in days)
+        lines.append(f"{row}  {name}")
+
+    text = "\n".join(lines)
+    notes = partial_note(days[0]) + stale_note()
+    for i in range(0, len(text), 4000):
+        await message.answer(text[i:i + 4000] + (notes if i + 4000 >= len(text) else ""))
 
 # --- /room ---
 @router.message(Command("room"))
@@ -137,35 +254,18 @@ async def cmd_room(message: types.Message):
         await message.answer("Пример: `/room Дом 12`", parse_mode="Markdown")
         return
 
-    room_query = args[1].strip().lower()
-    
-    # Ищем room_id по названию
-    target_room_id = None
-    for rid, rname in ROOMS_CACHE.items():
-        if isinstance(rname, str) and rname.lower() == room_query:
-            target_room_id = rid
-            break
-        elif isinstance(rname, list):
-            for name in rname:
-                if name.lower() == room_query:
-                    target_room_id = rid
-                    break
-            if target_room_id:
-                break
-
-    if not target_room_id:
-        # Попробуем частичное совпадение
-        matches = []
-        for rid, rnames in ROOMS_CACHE.items():
-            if isinstance(rnames, list):
-                rname = ", ".join(rnames).strip()
-            else:
-                rname = str(rnames).strip()
-            if room_query in rname.lower():
-                matches.append(rname)
-        if matches:
+    room_query = args[1].strip()
+    rooms = await get_rooms()
+    room_index = await get_room_index()
+
+    # Ищем room_id по названию: точное совпадение, иначе ранжированные кандидаты
+    candidates = room_index.search(room_query)
+    if candidates and (candidates[0][2] == 1.0 or (len(candidates) == 1 and candidates[0][2] >= 0.8)):
+        target_room_id = candidates[0][0]
+    else:
+        if candidates:
             await message.answer(
-                f"Номер «{room_query}» не найден. Возможно, вы имели в виду:\n" + "\n".join(f"• {m}" for m in matches)
+                f"Номер «{room_query}» не найден. Возможно, вы имели в виду:\n" + "\n".join(f"• {name}" for _, name, _ in candidates)
             )
         else:
             await message.answer(f"Номер «{room_query}» не найден.")
@@ -173,26 +273,72 @@ async def cmd_room(message: types.Message):
 
     today = date.today()
     tomorrow = today + timedelta(days=1)
-    bookings = await search_checkins(today.isoformat(), tomorrow.isoformat())
+    if booking_store.covers(today.isoformat(), tomorrow.isoformat()):
+        # Хранилище свежее — берём брони номера из индекса, без перебора всех заездов
+        bookings = [b for b in booking_store.get_room_bookings(target_room_id) if today <= b.day_in <= tomorrow]
+    else:
+        bookings = await get_bookings(today.isoformat(), tomorrow.isoformat())
 
     matched = []
-    for b in bookings:
-        if b["room_id"] == target_room_id and is_active_status(b["status_id"]):
-            checkin_date = b["date_in"][:10]
-            guest = format_guest_name(b)
-            total_guests = int(b.get("person", 1)) + int(b.get("person_add", 0))
-            matched.append((checkin_date, guest, total_guests))
+    for b in sorted(bookings, key=lambda x: x.day_in):
+        if b.room_id == target_room_id and b.active:
+            matched.append((b.day_in, format_guest_name(b), b.guests))
 
     if not matched:
-        room_name = ROOMS_CACHE.get(target_room_id, f"ID {target_room_id}")
-        await message.answer(f"Нет заездов в «{room_name}» на сегодня и завтра.")
+        room_name = get_room_name(target_room_id, rooms)
+        await message.answer(f"Нет заездов в «{room_name}» на сегодня и завтра." + stale_note())
     else:
         lines = []
         for checkin_date, guest, guests in matched:
-            d_label = "Сегодня" if checkin_date == today.isoformat() else "Завтра"
+            d_label = "Сегодня" if checkin_date == today else "Завтра"
             lines.append(f"• {d_label} — {guest} ({guests} гостя)")
-        room_name = ROOMS_CACHE.get(target_room_id, f"ID {target_room_id}")
-        await message.answer(f"🏨 {room_name}:\n" + "\n".join(lines))
+        room_name = get_room_name(target_room_id, rooms)
+        await message.answer(f"🏨 {room_name}:\n" + "\n".join(lines) + stale_note())
+
+
+# --- /guest ---
+# Сколько броней показывать в ответе /guest
+GUEST_SEARCH_LIMIT = 20
+
+
+@router.message(Command("guest"))
+async def cmd_guest(message: types.Message):
+    """Ищет брони гостя по фамилии (и имени) в окне хранилища бронирований."""
+    if not can_access_command(message.from_user.id, "/guest"):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        logger.warning(f"Пользователь {message.from_user.id} попытался выполнить /guest без прав.")
+        return
+
+    args = message.text.split(maxsplit=1)
+    if len(args) < 2 or len(args[1].strip()) < 2:
+        await message.answer("Пример: `/guest Иванов` или `/guest Иванов Ив`", parse_mode="Markdown")
+        return
+
+    query = args[1].strip()
+    index = get_guest_index()
+    if index is None:
+        await message.answer("⚠️ Бронирования ещё не загружены, попробуйте через минуту.")
+        return
+
+    found = [b for b in index.search(query) if b.active]
+    if not found:
+        window = booking_store.get_sync_info()["window"]
+        first, last = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+        await message.answer(
+            f"Гость «{query}» не найден среди заездов с {first.strftime('%d.%m')} по {last.strftime('%d.%m')}." + stale_note()
+        )
+        return
+
+    rooms = await get_rooms()
+    lines = [f"🔎 «{query}»: найдено {len(found)}\n"]
+    for b in found[:GUEST_SEARCH_LIMIT]:
+        lines.append(
+            f"• {format_guest_name(b)} — {get_room_name(b.room_id, rooms)}, "
+            f"{b.day_in.strftime('%d.%m')} – {b.day_out.strftime('%d.%m')} ({b.guests} гостя)"
+        )
+    if len(found) > GUEST_SEARCH_LIMIT:
+        lines.append(f"… и ещё {len(found) - GUEST_SEARCH_LIMIT}. Уточните запрос, например: /guest Иванов Ив")
+    await message.answer("\n".join(lines) + stale_note())
 
 
 # --- /spa ---
@@ -205,49 +351,314 @@ async def cmd_spa(message: types.Message):
         logger.warning(f"Пользователь {message.from_user.id} попытался выполнить /spa без прав.")
         return
 
-    SPA_ID = SPA_ROOM_ID
     today = date.today()
-    tomorrow = today + timedelta(days=1)
-    bookings = await search_checkins(today.isoformat(), tomorrow.isoformat())
-
-    spa_bookings = []
-    for b in bookings:
-        if b.get("room_id") == SPA_ID and is_active_status(b["status_id"]):
-            checkin_date = b["date_in"][:10]
-            checkin_time = b["date_in"][11:16]
-            checkout_time = b["date_out"][11:16]
-            guest = format_guest_name(b)
-            total_guests = int(b.get("person", 1)) + int(b.get("person_add", 0))
-            spa_bookings.append({
-                "date": checkin_date,
-                "time_in": checkin_time,
-                "time_out": checkout_time,
-                "guest": guest,
-                "guests": total_guests
-            })
-            
-    # Сортировка по времени начала   
-    spa_bookings.sort(key=lambda x: x["time_in"])
-    
-    if not spa_bookings:
-        await message.answer("Нет бронирований в СПА на сегодня и завтра.")
+    await message.answer(await build_spa_text(today) + stale_note(), reply_markup=await _page_keyboard("spa", today))
+
+
+async def build_spa_text(from_day: date, store_only: bool = False) -> str:
+    """
+    Текст броней СПА на from_day и следующий день (без пометки об устаревших данных).
+    Используется /spa, листанием кнопками и рассылкой.
+    :param store_only: Брать брони только из локального хранилища (листание кнопками).
+    """
+    today = date.today()
+    to_day = from_day + timedelta(days=1)
+    bookings, fingerprint = await get_bookings_snapshot(from_day.isoformat(), to_day.isoformat(), store_only)
+    if fingerprint is not None:
+        # При нескольких помещениях СПА в тексте их названия из справочника номеров
+        fingerprint += (data_version('rooms'),)
+    return get_rendered(
+        ("spa", today.isoformat(), from_day.isoformat(), tuple(SPA_ROOM_IDS)),
+        fingerprint,
+        lambda: _render_spa(bookings, SPA_ROOM_IDS, [from_day, to_day], today),
+    )
+
+
+# --- /spa_free ---
+# Самый длинный период для /spa_free
+MAX_SPA_FREE_DAYS = 7
+
+
+@router.message(Command("spa_free"))
+async def cmd_spa_free(message: types.Message):
+    """Показывает свободное время СПА на день или период (не длиннее недели)."""
+    if not can_access_command(message.from_user.id, "/spa_free"):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        logger.warning(f"Пользователь {message.from_user.id} попытался выполнить /spa_free без прав.")
+        return
+
+    # /spa_free [дата или период] [длительность, мин]
+    today = date.today()
+    from_day = to_day = today
+    length = SPA_SLOT_MINUTES
+    for arg in message.text.split()[1:]:
+        if arg.isdigit():
+            length = max(1, int(arg))
+            continue
+        period = _parse_period(arg)
+        if period is None or (period[1] - period[0]).days >= MAX_SPA_FREE_DAYS:
+            await message.answer(
+                "❌ Неверный период.\n"
+                f"Используйте: `/spa_free 2026-10-20..2026-10-26 90` (не длиннее {MAX_SPA_FREE_DAYS} дн.)",
+                parse_mode="Markdown"
+            )
+            return
+        from_day, to_day = period
+
+    window = booking_store.get_sync_info()["window"]
+    if window is None:
+        await message.answer("⚠️ Бронирования ещё не загружены, попробуйте через минуту.")
+        return
+    if not booking_store.covers(from_day.isoformat(), to_day.isoformat(), allow_stale=True):
+        first, last = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+        await message.answer(f"❌ Брони доступны с {first.strftime('%d.%m')} по {last.strftime('%d.%m')}.")
+        return
+
+    parts = []
+    for i in range((to_day - from_day).days + 1):
+        d = from_day + timedelta(days=i)
+        lines = [f"💆‍♀️ {_day_label(d, today)}, {d.strftime('%d.%m')}:"]
+        for room_id, slots in get_free_slots(d, length).items():
+            if len(SPA_ROOM_IDS) > 1:
+                lines.append(f"{get_cached_room_name(room_id)}:")
+            if slots:
+                lines.extend(f"• {format_time(start)} – {format_time(end)}" for start, end in slots)
+            else:
+                lines.append("• Нет свободного времени")
+        parts.append("\n".join(lines))
+
+    text = f"🕒 Свободное время СПА (от {length} мин)\n\n" + "\n\n".join(parts)
+    for i in range(0, len(text), 4000):
+        await message.answer(text[i:i + 4000] + (stale_note() if i + 4000 >= len(text) else ""))
+
+
+# --- Листание дней кнопками ---
+# Сообщения /arrival, /arrival2 и /spa получают кнопки ◀ ▶ и фильтр категорий.
+# Нажатие редактирует то же сообщение; брони берутся только из локального хранилища,
+# поэтому листание не делает запросов к Lite PMS и не добавляет сообщений в чат.
+
+PAGED_VIEWS = ("arrival", "arrival2", "spa")
+
+
+class BookingPage(CallbackData, prefix="bp"):
+    """Страница: вид (команда без /), первый день (date.toordinal()) и номер категории (-1 — все)."""
+    view: str
+    day: int
+    cat: int = -1
+
+
+async def _page_categories(view: str) -> List[str]:
+    """Категории для фильтра: у /arrival — ARRIVAL_CATEGORIES, у /arrival2 — все, у /spa фильтра нет."""
+    if view == "arrival":
+        return ARRIVAL_CATEGORIES
+    if view == "arrival2":
+        categories = await get_data('categories') or {}
+        return sorted(categories.values())
+    return []
+
+
+async def _page_keyboard(view: str, day: date, cat: int = -1, categories: Optional[List[str]] = None) -> types.InlineKeyboardMarkup:
+    if categories is None:
+        categories = await _page_categories(view)
+    kb = InlineKeyboardBuilder()
+    kb.button(text="◀", callback_data=BookingPage(view=view, day=day.toordinal() - 1, cat=cat))
+    kb.button(text="📅 Сегодня", callback_data=BookingPage(view=view, day=date.today().toordinal(), cat=cat))
+    kb.button(text="▶", callback_data=BookingPage(view=view, day=day.toordinal() + 1, cat=cat))
+    if len(categories) > 1:
+        kb.button(text=("✅ " if cat < 0 else "") + "Все", callback_data=BookingPage(view=view, day=day.toordinal()))
+        for i, name in enumerate(categories):
+            kb.button(text=("✅ " if i == cat else "") + name, callback_data=BookingPage(view=view, day=day.toordinal(), cat=i))
+    kb.adjust(3, 2)
+    return kb.as_markup()
+
+
+async def _build_page(view: str, day: date, category: Optional[str]) -> Optional[str]:
+    if view == "arrival":
+        return await build_arrival_text(
+            day, day + timedelta(days=1), categories=[category] if category else None, store_only=True
+        )
+    if view == "arrival2":
+        return await build_arrival2_text(day, category, store_only=True)
+    return await build_spa_text(day, store_only=True)
+
+
+@router.callback_query(BookingPage.filter())
+async def on_booking_page(callback: types.CallbackQuery, callback_data: BookingPage):
+    """Показывает в том же сообщении другие дни или категорию."""
+    view = callback_data.view
+    if view not in PAGED_VIEWS or not can_access_command(callback.from_user.id, f"/{view}"):
+        await callback.answer("❌ У вас нет прав для выполнения этой команды.", show_alert=True)
+        logger.warning(f"Пользователь {callback.from_user.id} попытался листать /{view} без прав.")
+        return
+
+    try:
+        day = date.fromordinal(callback_data.day)
+    except (ValueError, OverflowError):
+        await callback.answer()
+        return
+    window = booking_store.get_sync_info()["window"]
+    if window is None:
+        await callback.answer("⚠️ Бронирования ещё не загружены, попробуйте через минуту.", show_alert=True)
+        return
+    if not booking_store.covers(day.isoformat(), (day + timedelta(days=1)).isoformat(), allow_stale=True):
+        first, last = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+        await callback.answer(f"📅 Брони доступны с {first.strftime('%d.%m')} по {last.strftime('%d.%m')}.", show_alert=True)
+        return
+
+    categories = await _page_categories(view)
+    cat = callback_data.cat if 0 <= callback_data.cat < len(categories) else -1
+    text = await _build_page(view, day, categories[cat] if cat >= 0 else None)
+    if text is None:
+        await callback.answer("❌ Не найдены номера в категории.", show_alert=True)
+        return
+
+    try:
+        await callback.message.edit_text(
+            text[:4000] + stale_note(),
+            reply_markup=await _page_keyboard(view, day, cat, categories),
+        )
+    except TelegramBadRequest as e:
+        # Повторное нажатие той же кнопки — сообщение уже такое
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+
+# --- /today ---
+@router.message(Command("today"))
+async def cmd_today(message: types.Message):
+    """Сводка дня: заезды, выезды, проживающие, загрузка, гости по категориям и загрузка СПА."""
+    if not can_access_command(message.from_user.id, "/today"):
+        await message.answer("❌ У вас нет прав для выполнения этой команды.")
+        logger.warning(f"Пользователь {message.from_user.id} попытался выполнить /today без прав.")
         return
 
+    today = date.today()
+    if not booking_store.covers(today.isoformat(), today.isoformat(), allow_stale=True):
+        await message.answer("⚠️ Бронирования ещё не загружены, попробуйте через минуту.")
+        return
+
+    rooms = await get_rooms()
+    categories = await get_data('categories') or {}
+    fingerprint = (booking_store_version(), data_version('rooms'), data_version('categories'))
+    text = get_rendered(
+        ("today", today.isoformat()),
+        fingerprint,
+        lambda: _render_today(get_day_summary(today, SPA_ROOM_IDS), rooms, categories, today),
+    )
+    await message.answer(text + partial_note(today) + stale_note())
+
+
+# --- Построение текстов ---
+# Тексты /arrival, /arrival2 и /spa строятся один раз на снимок бронирований
+# и переиспользуются для всех сотрудников (см. bot.cache.get_rendered).
+
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+def _day_label(d: date, today: date) -> str:
+    if d == today:
+        return "Сегодня"
+    if d == today + timedelta(days=1):
+        return "Завтра"
+    return WEEKDAYS[d.weekday()]
+
+
+def _render_arrivals(
+    bookings: List[Booking],
+    room_name: Callable[[str], str],
+    days: List[date],
+    today: date,
+    sort_by_room: bool = False,
+    occupancy: Optional[Dict[date, Tuple[int, int, bool]]] = None,
+) -> str:
+    """
+    Активные заезды по дням.
+    :param occupancy: {день: (занято, всего номеров, точно ли)} — добавляется к заголовку дня;
+                      неточная занятость (см. booking_store.complete_from) помечается «≈».
+    """
+    active = [b for b in bookings if b.active]
+    if sort_by_room:
+        # Сортируем по названию номера
+        active.sort(key=lambda x: room_name(x.room_id))
+
+    grouped: Dict[date, List[Booking]] = {d: [] for d in days}
+    for b in active:
+        if b.day_in in grouped:
+            grouped[b.day_in].append(b)
+
     parts = []
-    for d in [today, tomorrow]:
-        d_str = d.isoformat()
-        label = "Сегодня" if d == today else "Завтра"
-        day_label = f"💆‍♀️ {label}, {d.strftime('%d.%m')}:"
-        entries = [b for b in spa_bookings if b["date"] == d_str]
+    for d in days:
+        header = f"📅 {_day_label(d, today)}, {d.strftime('%d.%m')}"
+        if occupancy and d in occupancy:
+            occupied, total, exact = occupancy[d]
+            header += f" (занято {'' if exact else '≈'}{occupied} из {total})"
+        entries = grouped[d]
         if entries:
             lines = []
             for b in entries:
+                lines.append(f"• {room_name(b.room_id)} — {format_guest_name(b)} ({b.guests} гостя)")
+            parts.append(f"{header}:\n" + "\n".join(lines))
+        else:
+            parts.append(f"{header}:\n• Нет заездов")
+    return "\n\n".join(parts)
+
+
+def _render_today(summary: dict, rooms: Dict[str, dict], categories: Dict[str, str], today: date) -> str:
+    """Текст /today из сводки get_day_summary."""
+    total_rooms = sum(1 for room_id in rooms if room_id not in SPA_ROOM_IDS)
+    occupied = summary["in_house_rooms"]
+    percent = occupied * 100 / total_rooms if total_rooms else 0.0
+
+    by_category: Dict[str, int] = {}
+    for room_id, guests in summary["guests_by_room"].items():
+        room = rooms.get(room_id) or {}
+        category = categories.get(str(room.get("cat_id", "")), "Без категории")
+        by_category[category] = by_category.get(category, 0) + guests
+
+    lines = [
+        f"📊 Сводка на {today.strftime('%d.%m.%Y')}\n",
+        f"🛬 Заезды: {summary['arrivals']}",
+        f"🛫 Выезды: {summary['departures']}",
+        f"🏨 Проживают: {summary['in_house_guests']} гостей в {occupied} номерах",
+        f"📈 Загрузка: {percent:.0f}% ({occupied} из {total_rooms})",
+    ]
+    if by_category:
+        lines.append("\n👥 Гости по категориям:")
+        for category, guests in sorted(by_category.items(), key=lambda item: (-item[1], item[0])):
+            lines.append(f"• {category}: {guests}")
+    hours = summary["spa_minutes"] / 60
+    lines.append(
+        f"\n💆‍♀️ СПА: {summary['spa_bookings']} броней, {hours:.1f} ч, {summary['spa_guests']} гостей"
+    )
+    return "\n".join(lines)
+
+
+def _render_spa(bookings: List[Booking], spa_room_ids: List[str], days: List[date], today: date) -> str:
+    """Брони СПА по дням, по времени начала; при нескольких помещениях у брони указывается помещение."""
+    spa_bookings = [b for b in bookings if b.room_id in spa_room_ids and b.active]
+
+    # Сортировка по времени начала
+    spa_bookings.sort(key=lambda x: x.time_in)
+
+    if not spa_bookings:
+        if days == [today, today + timedelta(days=1)]:
+            return "Нет бронирований в СПА на сегодня и завтра."
+        return f"Нет бронирований в СПА на {days[0].strftime('%d.%m')} – {days[-1].strftime('%d.%m')}."
+
+    parts = []
+    for d in days:
+        day_label = f"💆‍♀️ {_day_label(d, today)}, {d.strftime('%d.%m')}:"
+        entries = [b for b in spa_bookings if b.day_in == d]
+        if entries:
+            lines = []
+            for b in entries:
+                place = f"{get_cached_room_name(b.room_id)} — " if len(spa_room_ids) > 1 else ""
                 lines.append(
-                    f"• {b['guest']} ({b['guests']} гостя)\n"
-                    f"  🕒 {b['time_in']} – {b['time_out']}"
+                    f"• {place}{format_guest_name(b)} ({b.guests} гостя)\n"
+                    f"  🕒 {format_time(b.time_in)} – {format_time(b.time_out)}"
                 )
             parts.append(f"{day_label}\n" + "\n".join(lines))
         else:
             parts.append(f"{day_label}\n• Нет бронирований")
-
-    await message.answer("\n\n".join(parts))
\ No newline at end of file
+    return "\n\n".join(parts)
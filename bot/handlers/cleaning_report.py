@@ -13,7 +13,7 @@ from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
 # Импорты настроек, кэша, API
 from bot.config import CLEANING_REPORTS_CHANNEL_ID, CLEANING_ZONES
-from bot.api.litepms import set_cleaning_status
+from bot.utils.outbox import enqueue_write
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -321,23 +321,18 @@ async def process_final_step(message: Message, state: FSMContext):
     # --- Обновление статуса уборки в Lite PMS ---
     room_id_in_litepms = report_data.get('room_id_in_litepms')
     if room_id_in_litepms:
+        # Зона может включать несколько номеров через запятую — обновляем их одним пакетом.
+        # Запись выполняется в фоне через outbox; об окончательной ошибке придёт сообщение.
+        room_ids = [rid.strip() for rid in str(room_id_in_litepms).split(",") if rid.strip()]
         try:
-            result = await set_cleaning_status(room_id=room_id_in_litepms, status_id="0")
-            if result is None:
-                 logger.error(f"Функция set_cleaning_status вернула None для room_id={room_id_in_litepms}")
-                 await message.answer("⚠️ Произошла ошибка при обновлении статуса уборки в системе (пустой ответ от API).")
-            elif result.get("status") == "success":
-                logger.info(f"Статус уборки для номера/зоны {room_id_in_litepms} обновлен на 'Чистый'.")
-                # Не отправляем сообщение пользователю, если он не админ, чтобы не дублировать.
-                # await message.answer("✅ Статус уборки зоны в системе обновлен на 'Чистый'.")
-            else:
-                # Обрабатываем ошибку от API
-                error_msg = result.get("data", "Неизвестная ошибка или некорректный ответ от API.")
-                logger.error(f"Ошибка обновления статуса уборки для {room_id_in_litepms}: {error_msg}")
-                # await message.answer(f"⚠️ Не удалось обновить статус уборки в системе: {error_msg}")
+            enqueue_write(
+                "set_cleaning_status",
+                {"room_ids": room_ids, "status_id": "0"},
+                chat_id=message.chat.id,
+                description=f"статус уборки зоны «{report_data['zone_name']}»",
+            )
         except Exception as e:
-            logger.error(f"Исключение при обновлении статуса уборки в Lite PMS для {room_id_in_litepms}: {e}", exc_info=True)
-            # await message.answer(f"⚠️ Произошла ошибка при обновлении статуса уборки в системе: {e}")
+            logger.error(f"Не удалось поставить в очередь обновление статуса уборки для {room_id_in_litepms}: {e}", exc_info=True)
     else:
         logger.info(f"Для зоны '{report_data['zone_name']}' не указан ID в LitePMS. Статус уборки не обновлялся.")
 
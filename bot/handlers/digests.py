@@ -0,0 +1,69 @@
+# bot/handlers/digests.py
+from aiogram import Router, types
+from aiogram.filters import Command
+
+from bot.config import DIGEST_SCHEDULE
+from bot.utils.digests import DIGESTS, can_subscribe, subscribe, unsubscribe, get_subscriptions
+
+router = Router()
+
+
+def _digests_help(user_id: int) -> str:
+    subscribed = set(get_subscriptions(user_id))
+    lines = ["📬 Утренние рассылки\n"]
+    for name, (title, _, _) in DIGESTS.items():
+        if not can_subscribe(user_id, name):
+            continue
+        at = DIGEST_SCHEDULE.get(name)
+        when = f"в {at}" if at else "не запланирована"
+        mark = "✅" if name in subscribed else "▫️"
+        lines.append(f"{mark} `{name}` — {title} ({when})")
+    if len(lines) == 1:
+        return "Для вашей роли рассылок нет."
+    lines.append("\nПодписаться: `/subscribe arrivals`, отписаться: `/unsubscribe arrivals`")
+    return "\n".join(lines)
+
+
+@router.message(Command("digests"))
+async def cmd_digests(message: types.Message):
+    """Показывает доступные рассылки и подписки пользователя."""
+    await message.answer(_digests_help(message.from_user.id), parse_mode="Markdown")
+
+
+@router.message(Command("subscribe"))
+async def cmd_subscribe(message: types.Message):
+    """Подписывает на утреннюю рассылку."""
+    user_id = message.from_user.id
+    args = message.text.split()
+    if len(args) < 2:
+        await message.answer(_digests_help(user_id), parse_mode="Markdown")
+        return
+
+    name = args[1].strip().lower()
+    if name not in DIGESTS:
+        await message.answer(f"❌ Нет рассылки «{name}». Список: /digests")
+        return
+    if not can_subscribe(user_id, name):
+        await message.answer("❌ У вас нет прав на эту рассылку.")
+        return
+
+    title = DIGESTS[name][0]
+    if subscribe(user_id, name):
+        await message.answer(f"✅ Вы подписаны: {title}, каждый день в {DIGEST_SCHEDULE.get(name, '—')}.")
+    else:
+        await message.answer(f"ℹ️ Вы уже подписаны: {title}.")
+
+
+@router.message(Command("unsubscribe"))
+async def cmd_unsubscribe(message: types.Message):
+    """Отписывает от утренней рассылки."""
+    args = message.text.split()
+    if len(args) < 2:
+        await message.answer("Пример: `/unsubscribe arrivals`", parse_mode="Markdown")
+        return
+
+    name = args[1].strip().lower()
+    if unsubscribe(message.from_user.id, name):
+        await message.answer(f"✅ Вы отписаны от рассылки «{name}».")
+    else:
+        await message.answer(f"ℹ️ Вы не были подписаны на «{name}».")
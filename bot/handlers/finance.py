@@ -2,11 +2,16 @@ from aiogram import Router, types
 from aiogram.filters import Command
 from datetime import date, datetime
 
-from bot.api.litepms import get_cashbox_transactions, add_cashbox_transaction
+from bot.api.litepms import iter_cashbox_transactions
+from bot.cache import get_cashbox, get_cached_cashbox
+from bot.utils.outbox import enqueue_write
 from bot.utils.permissions import can_access_command  # ← НОВОЕ: проверка прав
 
 router = Router()
 
+# Самый длинный период для /dop: больше месяца операций не умещается в сообщения и нагружает Lite PMS
+MAX_DOP_PERIOD_DAYS = 31
+
 # --- /dop ---
 @router.message(Command("dop"))
 async def cmd_dop(message: types.Message):
@@ -17,46 +22,81 @@ async def cmd_dop(message: types.Message):
         await message.answer("❌ У вас нет прав для выполнения этой команды.")
         return
 
-    args = message.text.split(maxsplit=1)
-    if len(args) < 2:
-        target_date = date.today()
+    # /dop — сегодня, /dop 2025.09.26 — день, /dop 2025.09.01 2025.09.30 — период
+    args = message.text.split()
+    try:
+        dates = [datetime.strptime(arg.strip(), "%Y.%m.%d").date() for arg in args[1:3]]
+    except ValueError:
+        await message.answer(
+            "❌ Неверный формат даты.\n"
+            "Используйте: `/dop 2025.09.26` или `/dop 2025.09.01 2025.09.30`",
+            parse_mode="Markdown"
+        )
+        return
+    from_date = dates[0] if dates else date.today()
+    to_date = dates[1] if len(dates) > 1 else from_date
+    if to_date < from_date:
+        from_date, to_date = to_date, from_date
+    if (to_date - from_date).days >= MAX_DOP_PERIOD_DAYS:
+        await message.answer(f"❌ Период не может быть длиннее {MAX_DOP_PERIOD_DAYS} дн.")
+        return
+
+    is_range = from_date != to_date
+    if is_range:
+        period_label = f"{from_date.strftime('%d.%m.%Y')} – {to_date.strftime('%d.%m.%Y')}"
     else:
-        date_str = args[1].strip()
-        try:
-            target_date = datetime.strptime(date_str, "%Y.%m.%d").date()
-        except ValueError:
-            await message.answer(
-                "❌ Неверный формат даты.\n"
-                "Используйте: `/dop 2025.09.26`",
-                parse_mode="Markdown"
-            )
-            return
-
-    date_iso = target_date.isoformat()
-    transactions = await get_cashbox_transactions(date_iso, date_iso)
+        period_label = from_date.strftime('%d.%m.%Y')
 
     TARGET_INCOME_ID = "9534"  # или используйте bot.config.DOP_INCOME_ID, если есть
-    filtered = []
-    for tx in transactions:
+
+    def is_dop(tx: dict) -> bool:
         try:
             price = float(tx.get("price", 0))
             income_id = str(tx.get("income", {}).get("id", ""))
-            if price > 0 and income_id == TARGET_INCOME_ID:
-                filtered.append(tx)
+            return price > 0 and income_id == TARGET_INCOME_ID
         except (ValueError, TypeError, AttributeError):
-            continue
+            return False
+
+    filtered = []
+    try:
+        if is_range:
+            # Длинный период запрашивается частями параллельно и кэшируется до следующей записи в кассу
+            transactions = await get_cashbox(from_date.isoformat(), to_date.isoformat())
+            if transactions is None:
+                raise RuntimeError("Lite PMS не ответил")
+            filtered = [tx for tx in transactions if is_dop(tx)]
+            filtered.sort(key=lambda tx: tx.get("date", ""))
+        else:
+            # Операции за сегодня планировщик держит в кэше; другие дни читаются потоково,
+            # в памяти остаются только отфильтрованные
+            cached = get_cached_cashbox(from_date.isoformat(), to_date.isoformat())
+            if cached is not None:
+                filtered = [tx for tx in cached if is_dop(tx)]
+            else:
+                async for tx in iter_cashbox_transactions(from_date.isoformat(), to_date.isoformat()):
+                    if is_dop(tx):
+                        filtered.append(tx)
+    except RuntimeError as e:
+        await message.answer(f"❌ Не удалось получить кассовые операции: {e}")
+        return
 
     if not filtered:
-        await message.answer(f"Нет поступлений по статье «допы» за {target_date.strftime('%d.%m.%Y')}.")
+        await message.answer(f"Нет поступлений по статье «допы» за {period_label}.")
         return
 
-    lines = [f"💰 Поступления по статье «допы» за {target_date.strftime('%d.%m.%Y')}:\n"]
+    lines = [f"💰 Поступления по статье «допы» за {period_label}:\n"]
+    total = 0.0
     for tx in filtered:
-        time_str = tx.get("date", "")[11:16]  # "14:30"
+        # "2025-09-26 14:30:00" -> "14:30" (для периода — "26.09 14:30")
+        tx_date = tx.get("date", "")
+        time_str = f"{tx_date[8:10]}.{tx_date[5:7]} {tx_date[11:16]}" if is_range else tx_date[11:16]
         amount = float(tx.get("price", 0))
+        total += amount
         comment = tx.get("comment", "").strip() or "—"
         amount_fmt = f"{int(amount):,} ₽".replace(",", " ")
         lines.append(f"🕒 {time_str} | {amount_fmt} | {comment}")
+    if is_range:
+        lines.append(f"\nИтого: {int(total):,} ₽".replace(",", " "))
 
     full_text = "\n".join(lines)
     if len(full_text) > 4000:
@@ -132,15 +172,16 @@ async def cmd_cash(message: types.Message):
     # 0 — доход, 1 — расход
     type_id = 0 if op_type.lower() == "доход" else 1
 
+    # Запись в кассу выполняется в фоне через outbox — пользователь не ждёт Lite PMS.
+    # Если запись окончательно не удастся, пользователю придёт отдельное сообщение.
     try:
-        result = await add_cashbox_transaction(
-            price=amount,
-            type=type_id,
-            comment=comment,
-            # pay_type_id по умолчанию = 10874 (наличные), можно не указывать
+        enqueue_write(
+            "add_cashbox_transaction",
+            {"price": amount, "type": type_id, "comment": comment},
+            chat_id=message.chat.id,
+            description=f"{op_type.lower()} {amount} ₽, '{comment}'",
         )
-        op_id = result.get("data", [{}])[0].get("operation_id", "неизвестен")
-        await message.answer(f"✅ Операция создана: ID {op_id}, {amount} ₽, '{comment}'")
+        await message.answer(f"⏳ Операция принята: {amount} ₽, '{comment}'. Запись в кассу выполняется.")
         
         # --- ИСПРАВЛЕНИЕ: await внутри async def ---
         # Возвращаем к админ-меню
@@ -3,7 +3,7 @@ from aiogram import Router, types
 from aiogram.filters import Command
 
 from bot.utils.db import create_task, get_active_tasks, complete_task, get_task_room_id
-from bot.api.litepms import set_cleaning_status
+from bot.utils.outbox import enqueue_write
 
 router = Router()
 
@@ -29,36 +29,43 @@ async def cmd_task(message: types.Message):
 
 @router.message(Command("done"))
 async def cmd_done(message: types.Message):
-    """Помечает задачу как выполненную."""
+    """Помечает задачи как выполненные (можно несколько: `/done 5 6 7`)."""
    
     args = message.text.split()
     if len(args) < 2:
-        await message.answer("Пример: `/done 5`")
+        await message.answer("Пример: `/done 5` или `/done 5 6 7`")
         return
 
     try:
-        task_id = int(args[1])
+        task_ids = [int(arg) for arg in args[1:]]
     except ValueError:
         await message.answer("ID должен быть числом.")
         return
 
-    room_id = get_task_room_id(task_id)
-    if not room_id:
-        await message.answer(f"❌ Задача #{task_id} не найдена.")
-        # Возвращаем к админ-меню и выходим
-        from .base import cmd_admin_menu
-        await cmd_admin_menu(message)
-        return
-
-    updated = complete_task(task_id)
-
-    if room_id and room_id.isdigit():
-        try:
-            await set_cleaning_status(room_id, "0")
-        except Exception as e:
-            await message.answer(f"⚠️ Статус уборки не обновлён: {e}")
-
-    await message.answer(f"✅ Задача #{task_id} завершена.")
+    completed = []
+    room_ids = []
+    for task_id in task_ids:
+        room_id = get_task_room_id(task_id)
+        if not room_id:
+            await message.answer(f"❌ Задача #{task_id} не найдена.")
+            continue
+
+        updated = complete_task(task_id)
+        completed.append(task_id)
+        if room_id.isdigit():
+            room_ids.append(room_id)
+
+    # Статусы уборки всех номеров обновляются одним пакетом в фоне (outbox)
+    if room_ids:
+        enqueue_write(
+            "set_cleaning_status",
+            {"room_ids": room_ids, "status_id": "0"},
+            chat_id=message.chat.id,
+            description="статус уборки по задачам " + ", ".join(f"#{tid}" for tid in completed),
+        )
+
+    if completed:
+        await message.answer("✅ Завершены задачи: " + ", ".join(f"#{tid}" for tid in completed))
     
     # --- ИСПРАВЛЕНИЕ: await внутри async def ---
     # Возвращаем к админ-меню
@@ -1,12 +1,11 @@
 from aiogram import Router, types
 from aiogram.filters import Command
 from bot.utils.voice import transcribe_voice, WHISPER_AVAILABLE
-from bot.api.litepms import set_cleaning_status, fetch_rooms
+from bot.cache import get_room_index
+from bot.utils.outbox import enqueue_write
 
 router = Router()
 
-ROOMS_CACHE = {}
-
 @router.message(lambda message: message.voice is not None)  # ← Вот так фильтруем голосовые
 async def handle_voice_message(message: types.Message):
     
@@ -14,9 +13,7 @@ async def handle_voice_message(message: types.Message):
         await message.answer("🎙 Голосовые команды недоступны (Whisper не установлен).")
         return
 
-    global ROOMS_CACHE
-    if not ROOMS_CACHE:
-        ROOMS_CACHE = await fetch_rooms()
+    room_index = await get_room_index()
 
     try:
         file = await message.bot.get_file(message.voice.file_id)
@@ -27,17 +24,18 @@ async def handle_voice_message(message: types.Message):
         await message.reply(f"🎙 Распознано: _{text}_", parse_mode="Markdown")
 
         if any(word in text.lower() for word in ["убран", "готов", "сделан", "почищен"]):
-            found_room_id = None
-            found_room_name = None
-            for rid, rname in ROOMS_CACHE.items():
-                if rname.lower() in text.lower():
-                    found_room_id = rid
-                    found_room_name = rname
-                    break
-
-            if found_room_id:
-                await set_cleaning_status(found_room_id, "0")
-                await message.answer(f"✅ Статус уборки обновлён: {found_room_name} — чистый")
+            # В одном сообщении можно назвать несколько номеров: «Дом 12 и Дом 14 убраны»
+            found_rooms = {rid: room_index.names[rid] for rid in room_index.find_mentions(text)}
+
+            if found_rooms:
+                names = ", ".join(found_rooms.values())
+                enqueue_write(
+                    "set_cleaning_status",
+                    {"room_ids": list(found_rooms), "status_id": "0"},
+                    chat_id=message.chat.id,
+                    description=f"статус уборки: {names}",
+                )
+                await message.answer(f"✅ Принято: {names} — чистый. Статус уборки записывается в Lite PMS.")
             else:
                 await message.answer("❓ Не удалось определить номер. Скажите, например: «Дом 12 убран»")
 
@@ -0,0 +1,127 @@
+# bot/occupancy.py
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bot import booking_store
+from bot.api.booking import Booking
+from bot.cache import data_version, get_rooms
+from bot.config import SPA_ROOM_IDS
+
+logger = logging.getLogger(__name__)
+
+
+def popcount(mask: int) -> int:
+    """Количество единичных битов маски."""
+    return bin(mask).count("1")
+
+
+# --- Матрица занятости номеров ---
+# Номера × дни окна бронирований в виде битовых масок Python int: строка номера —
+# маска занятых ночей, столбец дня — маска занятых номеров. Занят ли номер в ночь
+# и сколько номеров (всех или из подмножества) занято в день, считается битовой
+# операцией над маской, без перебора броней и без запросов к Lite PMS.
+
+class OccupancyMatrix:
+    """Занятость номеров по ночам: бит i строки номера — ночь start + i дней."""
+
+    def __init__(self, start: date, days: int, room_ids: Iterable[str]):
+        self.start = start
+        self.days = days
+        self.room_ids: List[str] = list(room_ids)
+        self._room_pos: Dict[str, int] = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self.rows: List[int] = [0] * len(self.room_ids)
+        self.cols: List[int] = [0] * days
+
+    @property
+    def end(self) -> date:
+        """Последняя ночь, покрытая матрицей."""
+        return self.start + timedelta(days=self.days - 1)
+
+    def _clip(self, from_day: date, to_day: date) -> Optional[Tuple[int, int]]:
+        """Индексы ночей [first, last] пересечения периода с матрицей или None."""
+        first = max((from_day - self.start).days, 0)
+        last = min((to_day - self.start).days, self.days - 1)
+        return (first, last) if first <= last else None
+
+    @staticmethod
+    def _mask(first: int, last: int) -> int:
+        return ((1 << (last - first + 1)) - 1) << first
+
+    def mark(self, room_id: str, first_night: date, last_night: date):
+        """Отмечает номер занятым в ночи [first_night, last_night]."""
+        pos = self._room_pos.get(room_id)
+        span = self._clip(first_night, last_night)
+        if pos is None or span is None:
+            return
+        self.rows[pos] |= self._mask(*span)
+        room_bit = 1 << pos
+        for i in range(span[0], span[1] + 1):
+            self.cols[i] |= room_bit
+
+    def covers(self, from_day: date, to_day: date) -> bool:
+        return self.start <= from_day and to_day <= self.end
+
+    def room_mask(self, room_ids: Iterable[str]) -> int:
+        """Маска номеров для подсчёта занятости по их подмножеству (например, по категориям)."""
+        mask = 0
+        for room_id in room_ids:
+            pos = self._room_pos.get(room_id)
+            if pos is not None:
+                mask |= 1 << pos
+        return mask
+
+    def occupied_count(self, day: date, mask: Optional[int] = None) -> int:
+        """Сколько номеров (из mask, по умолчанию всех) занято в ночь day."""
+        i = (day - self.start).days
+        if not 0 <= i < self.days:
+            return 0
+        return popcount(self.cols[i] if mask is None else self.cols[i] & mask)
+
+    def is_occupied(self, room_id: str, day: date) -> bool:
+        pos = self._room_pos.get(room_id)
+        i = (day - self.start).days
+        return pos is not None and 0 <= i < self.days and bool(self.rows[pos] >> i & 1)
+
+
+def build_occupancy(bookings: Iterable[Booking], room_ids: Iterable[str], start: date, days: int) -> OccupancyMatrix:
+    """
+    Строит матрицу по активным броням. Бронь занимает ночи с даты заезда до дня перед выездом;
+    бронь на несколько часов (заезд и выезд в один день) — ночь даты заезда.
+    """
+    matrix = OccupancyMatrix(start, days, room_ids)
+    for b in bookings:
+        if b.active:
+            matrix.mark(b.room_id, b.day_in, max(b.day_in, b.day_out - timedelta(days=1)))
+    return matrix
+
+
+# Матрица перестраивается только при изменении хранилища бронирований или справочника номеров
+_matrix: Optional[OccupancyMatrix] = None
+_matrix_fingerprint: Optional[Tuple] = None
+
+
+async def get_occupancy() -> Optional[OccupancyMatrix]:
+    """
+    Матрица занятости по окну хранилища бронирований (без помещений СПА).
+    Проживания, заезд которых раньше начала окна, не видны ни в один из покрываемых ими дней,
+    поэтому до booking_store.complete_from() занятость может быть занижена.
+    :return: Матрица или None, если хранилище ещё не синхронизировано.
+    """
+    global _matrix, _matrix_fingerprint
+    window = booking_store.get_sync_info()["window"]
+    if window is None:
+        return None
+    fingerprint = (booking_store.get_version(), tuple(window), data_version('rooms'))
+    if _matrix is not None and fingerprint == _matrix_fingerprint:
+        return _matrix
+
+    rooms = await get_rooms()
+    start, end = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+    room_ids = [room_id for room_id in rooms if room_id not in SPA_ROOM_IDS]
+    # Брони берутся из индекса по номерам: помещения СПА и неизвестные номера не перебираются
+    bookings = [b for room_id in room_ids for b in booking_store.get_room_bookings(room_id)]
+    _matrix = build_occupancy(bookings, room_ids, start, (end - start).days + 1)
+    _matrix_fingerprint = fingerprint
+    logger.debug(f"ℹ️ Матрица занятости перестроена: {len(room_ids)} номеров × {_matrix.days} дней.")
+    return _matrix
@@ -0,0 +1,175 @@
+# bot/scheduler.py
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bot.config import SCHEDULER_JITTER, SCHEDULER_RETRY_MAX_DELAY
+from bot.utils.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+
+# --- Планировщик фоновых обновлений ---
+# У каждого набора данных своя периодичность. Запуски одной задачи никогда не
+# пересекаются (у задачи один цикл), время запуска размыто джиттером, после
+# неудачи следующий запуск откладывается: задержка растёт от обычного интервала.
+
+class Job:
+    """Периодическая задача и статистика её запусков."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Optional[bool]]],
+        interval: float,
+        jitter: float,
+        retry_max_delay: float,
+        first_delay: Optional[float],
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_max_delay = retry_max_delay
+        self.first_delay = first_delay
+        self.last_started: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_ok: Optional[bool] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0
+        self.runs = 0
+        self.next_run: Optional[datetime] = None
+        self.running = False
+
+    def _jittered(self, delay: float) -> float:
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def next_delay(self) -> float:
+        """
+        Задержка до следующего запуска: интервал с джиттером. После n неудач подряд —
+        min(интервал, retry_max_delay) · 2^(n-1), но не больше retry_max_delay: частая задача
+        повторяется не чаще обычного, редкая — через retry_max_delay, не дожидаясь интервала.
+        """
+        if self.failures:
+            first = min(self.interval, self.retry_max_delay)
+            delay = min(self.retry_max_delay, first * 2 ** min(self.failures - 1, 16))
+            # Джиттер только в большую сторону — повтор не раньше рассчитанной задержки
+            return delay * (1 + random.uniform(0, self.jitter))
+        return self._jittered(self.interval)
+
+    def initial_delay(self) -> float:
+        if self.first_delay is not None:
+            return self._jittered(self.first_delay)
+        # Первый запуск — в пределах доли интервала, чтобы задачи не стартовали разом
+        return random.uniform(0, self.interval * self.jitter)
+
+    async def run_once(self) -> bool:
+        """Выполняет задачу один раз. Функция задачи сообщает о неудаче, возвращая False или выбрасывая исключение."""
+        self.running = True
+        self.last_started = datetime.now()
+        started = time.monotonic()
+        try:
+            ok = await self.func() is not False
+            self.last_error = None if ok else "задача вернула ошибку"
+        except Exception as e:
+            logger.error(f"❌ Ошибка задачи '{self.name}': {e}", exc_info=True)
+            ok = False
+            self.last_error = str(e)
+        finally:
+            self.running = False
+            self.last_duration = time.monotonic() - started
+            self.runs += 1
+
+        self.last_ok = ok
+        self.failures = 0 if ok else self.failures + 1
+        return ok
+
+
+class Scheduler:
+    """Запускает зарегистрированные задачи, каждую в своём цикле."""
+
+    def __init__(self, jitter: float = 0.1, retry_max_delay: float = 900.0):
+        self.jitter = jitter
+        self.retry_max_delay = retry_max_delay
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Optional[bool]]],
+        interval: float,
+        first_delay: Optional[float] = None,
+    ) -> Job:
+        """
+        Регистрирует задачу.
+        :param func: Асинхронная функция без аргументов; False или исключение — неудачный запуск.
+        :param interval: Интервал между запусками в секундах.
+        :param first_delay: Задержка первого запуска (None — случайная в пределах доли интервала).
+        """
+        job = Job(name, func, interval, self.jitter, self.retry_max_delay, first_delay)
+        self.jobs[name] = job
+        return job
+
+    async def _loop(self, job: Job):
+        delay = job.initial_delay()
+        while True:
+            job.next_run = datetime.fromtimestamp(time.time() + delay)
+            await asyncio.sleep(delay)
+            job.next_run = None
+            ok = await job.run_once()
+            delay = job.next_delay()
+            if not ok:
+                logger.warning(f"⚠️ Задача '{job.name}' не удалась ({job.failures} подряд), повтор через {delay:.0f} с.")
+
+    def start(self):
+        """Запускает циклы всех задач."""
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}"))
+        logger.info(f"🚀 Планировщик запущен: {', '.join(self.jobs)}.")
+
+    async def stop(self):
+        """Останавливает циклы задач и дожидается их завершения."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def get_status(self) -> List[dict]:
+        """Состояние задач: последний запуск, длительность, результат, следующий запуск."""
+        return [
+            {
+                "name": job.name,
+                "interval": job.interval,
+                "last_started": job.last_started,
+                "last_duration": job.last_duration,
+                "last_ok": job.last_ok,
+                "last_error": job.last_error,
+                "failures": job.failures,
+                "runs": job.runs,
+                "next_run": job.next_run,
+                "running": job.running,
+            }
+            for job in self.jobs.values()
+        ]
+
+
+# Общий планировщик процесса; задачи регистрируются в main.py
+scheduler = Scheduler(SCHEDULER_JITTER, SCHEDULER_RETRY_MAX_DELAY)
+
+
+def _collect_metrics() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for job in scheduler.jobs.values():
+        if job.last_duration is not None:
+            values[(job.name, "last_duration_seconds")] = job.last_duration
+        if job.last_started is not None:
+            values[(job.name, "last_run_age_seconds")] = (datetime.now() - job.last_started).total_seconds()
+        values[(job.name, "failures")] = job.failures
+    return values
+
+
+Gauge("scheduler_job", "Задачи планировщика", _collect_metrics, ("job", "field"))
@@ -0,0 +1,145 @@
+# bot/spa_slots.py
+import logging
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from bot import booking_store
+from bot.api.booking import Booking
+from bot.config import SPA_ROOM_IDS, SPA_OPEN_TIME, SPA_CLOSE_TIME
+
+logger = logging.getLogger(__name__)
+
+# (начало, конец, ключ брони); время — минуты от 01.01.0001 (date.toordinal() * 1440 + минуты суток)
+Interval = Tuple[int, int, str]
+
+
+def _clock(value: str) -> int:
+    """'10:30' -> минуты от начала суток."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class IntervalIndex:
+    """
+    Брони одного помещения СПА, отсортированные по началу.
+    Поиск пересечений — двоичный поиск по началу (с запасом на самую длинную бронь)
+    и просмотр только подходящих интервалов: O(log n + k).
+    """
+
+    def __init__(self):
+        self.intervals: List[Interval] = []
+        # Самая длинная бронь: раньше начала периода минус max_length пересечений нет.
+        # При удалении не уменьшается — поиск лишь просматривает чуть больше кандидатов.
+        self.max_length = 0
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def add(self, interval: Interval):
+        insort(self.intervals, interval)
+        self.max_length = max(self.max_length, interval[1] - interval[0])
+
+    def remove(self, interval: Interval):
+        i = bisect_left(self.intervals, interval)
+        if i < len(self.intervals) and self.intervals[i] == interval:
+            del self.intervals[i]
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """Брони, пересекающиеся с [start, end), по возрастанию начала."""
+        result = []
+        i = bisect_left(self.intervals, (start - self.max_length,))
+        while i < len(self.intervals) and self.intervals[i][0] < end:
+            busy_start, busy_end, _ = self.intervals[i]
+            if busy_end > start:
+                result.append((busy_start, busy_end))
+            i += 1
+        return result
+
+    def free_slots(self, start: int, end: int, length: int) -> List[Tuple[int, int]]:
+        """Свободные промежутки [start, end) длиной не меньше length минут."""
+        slots = []
+        cursor = start
+        for busy_start, busy_end in self.overlapping(start, end):
+            if busy_start - cursor >= length:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= length:
+            slots.append((cursor, end))
+        return slots
+
+
+# --- Индекс броней СПА ---
+# Строится по хранилищу бронирований один раз и дальше обновляется по изменениям
+# из booking_store.add_change_listener. Если изменения пропущены (первая загрузка,
+# восстановление из снимка), версия хранилища расходится с версией индекса —
+# тогда индекс перестраивается целиком при следующем запросе.
+
+_index: Dict[str, IntervalIndex] = {}
+# Ключ брони -> (помещение, интервал), чтобы убрать старую версию брони без повторного разбора
+_entries: Dict[str, Tuple[str, Interval]] = {}
+# Версия хранилища, по которой построен индекс (None — не построен)
+_index_version: Optional[int] = None
+
+
+def _booking_interval(booking: Booking) -> Optional[Tuple[str, Interval]]:
+    if booking.room_id not in SPA_ROOM_IDS or not booking.active:
+        return None
+    start = booking.day_in.toordinal() * 1440 + booking.time_in
+    end = booking.day_out.toordinal() * 1440 + booking.time_out
+    if end <= start:
+        return None
+    return booking.room_id, (start, end, booking.key)
+
+
+def _add(booking: Booking):
+    entry = _booking_interval(booking)
+    if entry is not None:
+        room_id, interval = entry
+        _index[room_id].add(interval)
+        _entries[interval[2]] = entry
+
+
+def _rebuild():
+    global _index, _entries, _index_version
+    _index = {room_id: IntervalIndex() for room_id in SPA_ROOM_IDS}
+    _entries = {}
+    for booking in booking_store.get_all_bookings():
+        _add(booking)
+    _index_version = booking_store.get_version()
+    logger.debug(f"ℹ️ Индекс броней СПА перестроен: {len(_entries)} броней.")
+
+
+def _on_changes(changes: List[Tuple[Optional[Booking], Optional[Booking]]]):
+    global _index_version
+    # Каждая синхронизация с изменениями увеличивает версию хранилища на 1
+    if _index_version is None or _index_version != booking_store.get_version() - 1:
+        _index_version = None
+        return
+    for old, new in changes:
+        booking = new if new is not None else old
+        entry = _entries.pop(booking.key, None)
+        if entry is not None:
+            _index[entry[0]].remove(entry[1])
+        if new is not None:
+            _add(new)
+    _index_version = booking_store.get_version()
+
+
+booking_store.add_change_listener(_on_changes)
+
+
+def get_free_slots(day: date, length: int) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Свободное время помещений СПА в часы работы (SPA_OPEN_TIME–SPA_CLOSE_TIME).
+    :param length: Минимальная длительность промежутка, минут.
+    :return: {room_id: [(начало, конец)]} в минутах от начала суток day.
+    """
+    if _index_version != booking_store.get_version():
+        _rebuild()
+    base = day.toordinal() * 1440
+    open_at, close_at = base + _clock(SPA_OPEN_TIME), base + _clock(SPA_CLOSE_TIME)
+    return {
+        room_id: [(start - base, end - base) for start, end in _index[room_id].free_slots(open_at, close_at, length)]
+        for room_id in SPA_ROOM_IDS
+    }
@@ -0,0 +1,225 @@
+# bot/utils/digests.py
+import asyncio
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+from bot.api.resilience import TokenBucket
+from bot.auth.roles import USER_ROLES
+from bot.config import (
+    DB_PATH,
+    DIGEST_SCHEDULE,
+    DIGEST_MAX_DELAY_MINUTES,
+    DIGEST_SEND_RATE,
+    DIGEST_SEND_ATTEMPTS,
+)
+from bot.utils.metrics import Counter
+from bot.utils.permissions import has_permission
+
+logger = logging.getLogger(__name__)
+
+_messages_total = Counter("digest_messages_total", "Сообщения рассылок", ("digest", "result"))
+
+
+# --- Виды рассылок ---
+
+async def _render_arrivals() -> Optional[str]:
+    from bot.handlers.bookings import build_arrival_text
+    today = date.today()
+    return await build_arrival_text(today, today)
+
+
+async def _render_spa() -> Optional[str]:
+    from bot.handlers.bookings import build_spa_text
+    return await build_spa_text(date.today())
+
+
+# {имя: (название, право доступа, построение текста)}
+DIGESTS: Dict[str, Tuple[str, str, Callable[[], Awaitable[Optional[str]]]]] = {
+    "arrivals": ("🏨 Заезды на сегодня", "arrival", _render_arrivals),
+    "spa": ("💆‍♀️ СПА на сегодня и завтра", "spa", _render_spa),
+}
+
+
+# --- Подписки ---
+
+def init_digests():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS digest_subscriptions (
+            chat_id INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (chat_id, digest)
+        )
+    """)
+    # Дата последней отправки каждой рассылки: после перезапуска рассылка не уходит повторно
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS digest_runs (
+            digest TEXT PRIMARY KEY,
+            last_sent_date TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def can_subscribe(chat_id: int, digest: str) -> bool:
+    """Есть ли у пользователя право на содержимое рассылки (по роли из bot.auth.roles)."""
+    return digest in DIGESTS and has_permission(chat_id, DIGESTS[digest][1])
+
+
+def subscribe(chat_id: int, digest: str) -> bool:
+    """Подписывает чат на рассылку. :return: False, если подписка уже была."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("INSERT OR IGNORE INTO digest_subscriptions (chat_id, digest) VALUES (?, ?)", (chat_id, digest))
+    added = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+    return added
+
+
+def unsubscribe(chat_id: int, digest: str) -> bool:
+    """Отписывает чат от рассылки. :return: False, если подписки не было."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM digest_subscriptions WHERE chat_id = ? AND digest = ?", (chat_id, digest))
+    removed = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+    return removed
+
+
+def get_subscriptions(chat_id: int) -> List[str]:
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT digest FROM digest_subscriptions WHERE chat_id = ?", (chat_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def get_subscribers(digest: str) -> List[int]:
+    """Подписчики рассылки, у которых роль по-прежнему даёт право на её содержимое."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT chat_id FROM digest_subscriptions WHERE digest = ? ORDER BY chat_id", (digest,))
+    rows = cursor.fetchall()
+    conn.close()
+    subscribers = []
+    for (chat_id,) in rows:
+        if can_subscribe(chat_id, digest):
+            subscribers.append(chat_id)
+        else:
+            logger.info(f"ℹ️ Рассылка '{digest}' пропущена для {chat_id} (роль: {USER_ROLES.get(chat_id)}).")
+    return subscribers
+
+
+def _last_sent_date(digest: str) -> Optional[str]:
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT last_sent_date FROM digest_runs WHERE digest = ?", (digest,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def _mark_sent(digest: str, day: str):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO digest_runs (digest, last_sent_date) VALUES (?, ?) "
+        "ON CONFLICT(digest) DO UPDATE SET last_sent_date = excluded.last_sent_date",
+        (digest, day)
+    )
+    conn.commit()
+    conn.close()
+
+
+# --- Отправка ---
+# Один ограничитель на процесс: рассылки и уведомления об изменениях бронирований
+# вместе не превышают DIGEST_SEND_RATE сообщений в секунду от имени бота
+_send_limiter = TokenBucket(DIGEST_SEND_RATE, max(1, int(DIGEST_SEND_RATE)))
+
+
+async def deliver(bot, digest: str, chat_ids: List[int], text: str) -> Tuple[int, int]:
+    """
+    Отправляет один и тот же текст всем чатам; общая частота всех массовых отправок
+    не выше DIGEST_SEND_RATE сообщений в секунду.
+    На TelegramRetryAfter ждёт указанное Telegram время и повторяет сообщение.
+    :return: Количество чатов, получивших рассылку, и количество неудач.
+    """
+    limiter = _send_limiter
+    parts = [text[i:i + 4000] for i in range(0, len(text), 4000)] or [text]
+    sent = failed = 0
+    for chat_id in chat_ids:
+        delivered = True
+        for part in parts:
+            for attempt in range(1, DIGEST_SEND_ATTEMPTS + 1):
+                await limiter.acquire()
+                try:
+                    await bot.send_message(chat_id, part)
+                    break
+                except TelegramRetryAfter as e:
+                    logger.warning(f"⏳ Telegram просит подождать {e.retry_after} с (рассылка '{digest}', чат {chat_id}).")
+                    _messages_total.inc(digest, "retry_after")
+                    if attempt == DIGEST_SEND_ATTEMPTS:
+                        delivered = False
+                    else:
+                        await asyncio.sleep(e.retry_after)
+                except TelegramAPIError as e:
+                    logger.error(f"❌ Рассылка '{digest}' не доставлена в чат {chat_id}: {e}")
+                    delivered = False
+                    break
+            if not delivered:
+                break
+        if delivered:
+            sent += 1
+            _messages_total.inc(digest, "sent")
+        else:
+            failed += 1
+            _messages_total.inc(digest, "failed")
+    return sent, failed
+
+
+async def send_digest(bot, digest: str) -> Tuple[int, int]:
+    """Строит текст рассылки один раз и отправляет всем подписчикам."""
+    subscribers = get_subscribers(digest)
+    if not subscribers:
+        return 0, 0
+    title, _, render = DIGESTS[digest]
+    text = await render()
+    if text is None:
+        logger.warning(f"⚠️ Рассылка '{digest}' не построена: нет данных.")
+        return 0, 0
+    from bot.booking_store import stale_note
+    sent, failed = await deliver(bot, digest, subscribers, f"{title}\n\n{text}{stale_note()}")
+    logger.info(f"📬 Рассылка '{digest}': доставлено {sent}, ошибок {failed}.")
+    return sent, failed
+
+
+async def run_due_digests(bot, now: Optional[datetime] = None) -> bool:
+    """
+    Отправляет рассылки, время которых наступило сегодня и которые ещё не отправлялись.
+    Вызывается планировщиком раз в минуту. Рассылка отмечается отправленной до доставки,
+    чтобы сбой посреди отправки не привёл к повторной рассылке всем подписчикам.
+    """
+    now = now or datetime.now()
+    today = now.date().isoformat()
+    for digest, at in DIGEST_SCHEDULE.items():
+        if digest not in DIGESTS:
+            continue
+        scheduled = datetime.combine(now.date(), datetime.strptime(at, "%H:%M").time())
+        if now < scheduled or _last_sent_date(digest) == today:
+            continue
+        _mark_sent(digest, today)
+        if now - scheduled > timedelta(minutes=DIGEST_MAX_DELAY_MINUTES):
+            logger.warning(f"⚠️ Рассылка '{digest}' за {today} пропущена: время {at} давно прошло.")
+            continue
+        await send_digest(bot, digest)
+    return True
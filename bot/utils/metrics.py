@@ -0,0 +1,192 @@
+# bot/utils/metrics.py
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Все метрики процесса в порядке регистрации
+_registry: List["_Metric"] = []
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        key = tuple(str(v) for v in label_values)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, *label_values: str) -> float:
+        return self.values.get(tuple(str(v) for v in label_values), 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин (в секундах)."""
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # {метки: [счётчики корзин..., сумма, количество]}
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        key = tuple(str(v) for v in label_values)
+        series = self._series.get(key)
+        if series is None:
+            series = [0.0] * (len(self.buckets) + 2)
+            self._series[key] = series
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def series(self) -> Dict[LabelValues, Tuple[int, float]]:
+        """{метки: (количество наблюдений, сумма)}."""
+        return {key: (int(s[-1]), s[-2]) for key, s in self._series.items()}
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """Приблизительный квантиль по границам корзин (верхняя граница корзины)."""
+        series = self._series.get(tuple(str(v) for v in label_values))
+        if not series or not series[-1]:
+            return None
+        target = q * series[-1]
+        cumulative = 0.0
+        for i, bound in enumerate(self.buckets):
+            cumulative += series[i]
+            if cumulative >= target:
+                return bound
+        return math.inf
+
+    def render(self) -> List[str]:
+        lines = []
+        bucket_labels = self.labels + ("le",)
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, key + (_format_value(bound),))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, key + ('+Inf',))} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(series[-1])}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Текущее значение, вычисляемое при каждом чтении функцией collect() -> {метки: значение}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[LabelValues, float]], labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+
+    def read(self) -> Dict[LabelValues, float]:
+        try:
+            return self.collect()
+        except Exception as e:
+            logger.error(f"❌ Ошибка вычисления метрики {self.name}: {e}", exc_info=True)
+            return {}
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self.read().items())
+        ]
+
+
+def render_prometheus() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def render_summary() -> str:
+    """Краткая сводка метрик для сообщения в Telegram."""
+    lines = []
+    for metric in _registry:
+        if isinstance(metric, Histogram):
+            for key, (count, total) in sorted(metric.series().items()):
+                if not count:
+                    continue
+                p95 = metric.quantile(0.95, *key)
+                p95_text = "∞" if p95 is None or math.isinf(p95) else f"≤{p95 * 1000:.0f} мс"
+                lines.append(f"• {metric.help_text} [{', '.join(key)}]: {count} шт., среднее {total / count * 1000:.0f} мс, p95 {p95_text}")
+        elif isinstance(metric, Counter):
+            for key, value in sorted(metric.values.items()):
+                lines.append(f"• {metric.help_text} [{', '.join(key)}]: {value:.0f}")
+        elif isinstance(metric, Gauge):
+            for key, value in sorted(metric.read().items()):
+                label = f" [{', '.join(key)}]" if key else ""
+                lines.append(f"• {metric.help_text}{label}: {value:.1f}")
+    return "\n".join(lines) if lines else "Метрик пока нет."
+
+
+# --- HTTP-эндпоинт для Prometheus ---
+async def start_metrics_server(host: str, port: int):
+    """
+    Запускает локальный HTTP-сервер с эндпоинтом /metrics.
+    :return: aiohttp.web.AppRunner — остановить через await runner.cleanup().
+    """
+    from aiohttp import web
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"📈 Метрики доступны на http://{host}:{port}/metrics")
+    return runner
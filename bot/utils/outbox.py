@@ -0,0 +1,275 @@
+# bot/utils/outbox.py
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import date
+from typing import Optional
+
+from bot.config import (
+    DB_PATH,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BASE_DELAY,
+    OUTBOX_RETRY_MAX_DELAY,
+    OUTBOX_POLL_INTERVAL,
+)
+from bot.api.litepms import PMSRejectedError, add_cashbox_transaction, get_cashbox_transactions_range, set_cleaning_status_many
+
+logger = logging.getLogger(__name__)
+
+# Будит обработчик очереди сразу после постановки новой записи
+_wakeup: Optional[asyncio.Event] = None
+
+
+def init_outbox():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pms_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            chat_id INTEGER,
+            description TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def enqueue_write(operation: str, payload: dict, chat_id: Optional[int] = None, description: str = "") -> int:
+    """
+    Ставит запись в Lite PMS в очередь и сразу возвращает управление.
+    :param operation: Ключ из OPERATIONS.
+    :param payload: Аргументы операции (должны сериализоваться в JSON).
+    :param chat_id: Чат, куда сообщить, если запись так и не удалась.
+    :param description: Описание операции для пользователя.
+    :return: ID записи в очереди.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Неизвестная операция outbox: {operation}")
+    if operation == "add_cashbox_transaction":
+        # С этого дня повтор ищет в кассе операцию, которую Lite PMS мог уже провести
+        payload = {**payload, "day": date.today().isoformat()}
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO pms_outbox (operation, payload, chat_id, description) VALUES (?, ?, ?, ?)",
+        (operation, json.dumps(payload, ensure_ascii=False), chat_id, description)
+    )
+    outbox_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    if _wakeup is not None:
+        _wakeup.set()
+    logger.info(f"📮 Outbox #{outbox_id}: {operation} поставлена в очередь.")
+    return outbox_id
+
+
+def _next_pending():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id, operation, payload, chat_id, description, attempts, next_attempt_at "
+        "FROM pms_outbox WHERE status = 'pending' ORDER BY id LIMIT 1"
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def _update(outbox_id: int, **fields):
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(f"UPDATE pms_outbox SET {columns} WHERE id = ?", (*fields.values(), outbox_id))
+    conn.commit()
+    conn.close()
+
+
+def _recover_in_progress() -> int:
+    """
+    Возвращает в очередь записи, прерванные перезапуском бота. Запрос мог дойти до Lite PMS,
+    поэтому попытка засчитывается — операция проверит, не выполнена ли запись.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE pms_outbox SET status = 'pending', attempts = attempts + 1 WHERE status = 'in_progress'")
+    recovered = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return recovered
+
+
+def count_pending() -> int:
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM pms_outbox WHERE status = 'pending'")
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+# --- Операции ---
+# Каждая операция получает payload и признак maybe_sent: прошлая попытка могла дойти до Lite PMS
+# (таймаут, 5xx или перезапуск бота посреди записи). При ошибке операция выбрасывает исключение.
+# Payload можно изменить перед исключением — при повторе будет использован новый.
+
+class UncertainWriteError(RuntimeError):
+    """Неизвестно, выполнена ли запись, и проверить это нельзя — повторять опасно."""
+
+
+def _same_transaction(tx: dict, payload: dict) -> bool:
+    """Совпадает ли операция кассы с записью: сумма, комментарий и бронь (если Lite PMS её возвращает)."""
+    try:
+        if abs(abs(float(tx.get("price", 0))) - abs(float(payload["price"]))) >= 0.005:
+            return False
+    except (TypeError, ValueError):
+        return False
+    if str(tx.get("comment") or "").strip() != str(payload.get("comment") or "").strip():
+        return False
+    return "booking_id" not in tx or str(tx["booking_id"] or "") == str(payload.get("booking_id") or "")
+
+
+async def _count_same_transactions(payload: dict) -> int:
+    today = date.today().isoformat()
+    transactions = await get_cashbox_transactions_range(payload.get("day") or today, today)
+    return sum(1 for tx in transactions if _same_transaction(tx, payload))
+
+
+async def _prepare_add_cashbox_transaction(payload: dict):
+    # addCashboxTransaction не идемпотентен: повторная отправка создаёт вторую операцию в кассе.
+    # До первой отправки запоминаем, сколько таких же операций (сумма, комментарий, бронь) уже есть;
+    # если при повторе их стало больше, запись уже проведена. Комментарий пользователя не меняется.
+    if "seen" in payload or "marker" in payload:
+        return
+    payload["seen"] = await _count_same_transactions(payload)
+
+
+async def _op_add_cashbox_transaction(payload: dict, maybe_sent: bool):
+    fields = {key: value for key, value in payload.items() if key not in ("marker", "day", "seen")}
+    if maybe_sent:
+        if "seen" not in payload:
+            # Запись из старой версии очереди: её отправку проверить нечем
+            raise UncertainWriteError("запись могла быть проведена — проверьте кассу вручную")
+        if await _count_same_transactions(payload) > payload["seen"]:
+            logger.info(f"ℹ️ Операция {fields.get('price')} ₽ «{fields.get('comment', '')}» уже проведена в Lite PMS, повтор не нужен.")
+            return
+    await add_cashbox_transaction(**fields)
+
+
+async def _op_set_cleaning_status(payload: dict, maybe_sent: bool):
+    results = await set_cleaning_status_many(payload["room_ids"], payload.get("status_id", "0"))
+    failed = {rid: r for rid, r in results.items() if isinstance(r, Exception)}
+    # Номера, которые Lite PMS отклонил, не повторяются; о них сообщается, когда закончатся повторы остальных
+    rejected = payload.setdefault("rejected", {})
+    rejected.update({rid: str(e) for rid, e in failed.items() if isinstance(e, PMSRejectedError)})
+    temporary = {rid: e for rid, e in failed.items() if not isinstance(e, PMSRejectedError)}
+    if temporary:
+        # Повторяем только номера, которые не обновились из-за временной ошибки
+        payload["room_ids"] = list(temporary)
+        raise RuntimeError("; ".join(f"{rid}: {e}" for rid, e in temporary.items()))
+    if rejected:
+        raise PMSRejectedError("; ".join(f"{rid}: {e}" for rid, e in rejected.items()))
+
+
+OPERATIONS = {
+    "add_cashbox_transaction": _op_add_cashbox_transaction,
+    "set_cleaning_status": _op_set_cleaning_status,
+}
+# Подготовка перед отправкой: изменённый payload сохраняется до запроса к Lite PMS,
+# поэтому переживает и перезапуск бота посреди записи
+PREPARE = {
+    "add_cashbox_transaction": _prepare_add_cashbox_transaction,
+}
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(OUTBOX_RETRY_MAX_DELAY, OUTBOX_RETRY_BASE_DELAY * (2 ** (attempts - 1)))
+
+
+async def _process(bot, row) -> None:
+    outbox_id, operation, payload_raw, chat_id, description, attempts, _ = row
+    payload = json.loads(payload_raw)
+    try:
+        prepare = PREPARE.get(operation)
+        if prepare is not None:
+            await prepare(payload)
+        # Пока запрос выполняется, запись помечена: после перезапуска её проверят перед повтором
+        _update(outbox_id, status="in_progress", payload=json.dumps(payload, ensure_ascii=False))
+        await OPERATIONS[operation](payload, attempts > 0)
+    except Exception as e:
+        attempts += 1
+        # Отказ Lite PMS повтором не исправить, а строгий порядок очереди задержал бы все следующие записи
+        if attempts >= OUTBOX_MAX_ATTEMPTS or isinstance(e, (UncertainWriteError, PMSRejectedError)):
+            _update(outbox_id, status="failed", attempts=attempts, last_error=str(e), payload=json.dumps(payload, ensure_ascii=False))
+            logger.error(f"❌ Outbox #{outbox_id}: {operation} не выполнена после {attempts} попыток: {e}")
+            if chat_id:
+                try:
+                    await bot.send_message(chat_id, f"❌ Не удалось записать в Lite PMS: {description or operation}\nОшибка: {e}")
+                except Exception as send_error:
+                    logger.error(f"Не удалось уведомить чат {chat_id} об ошибке outbox #{outbox_id}: {send_error}")
+        else:
+            delay = _retry_delay(attempts)
+            _update(
+                outbox_id,
+                status="pending",
+                attempts=attempts,
+                next_attempt_at=time.time() + delay,
+                last_error=str(e),
+                payload=json.dumps(payload, ensure_ascii=False),
+            )
+            logger.warning(f"🔁 Outbox #{outbox_id}: {operation} — ошибка ({e}), повтор через {delay:.0f} с.")
+        return
+
+    _update(outbox_id, status="done", attempts=attempts + 1, last_error=None)
+    logger.info(f"✅ Outbox #{outbox_id}: {operation} выполнена.")
+
+
+async def run_outbox_worker(bot, poll_interval: float = OUTBOX_POLL_INTERVAL):
+    """
+    Выполняет записи из очереди строго по порядку: следующая запись не начинается,
+    пока не завершится (или окончательно не упадёт) предыдущая.
+    Незавершённые записи переживают перезапуск бота.
+    :param bot: Экземпляр aiogram.Bot для уведомлений об ошибках.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    recovered = _recover_in_progress()
+    if recovered:
+        logger.warning(f"⚠️ Outbox: {recovered} записей прервано перезапуском, будут проверены и повторены.")
+    pending = count_pending()
+    if pending:
+        logger.info(f"📮 В очереди outbox {pending} незавершённых записей.")
+
+    while True:
+        # Сбрасываем событие до чтения очереди, чтобы не пропустить запись, поставленную в этот момент
+        _wakeup.clear()
+        try:
+            row = _next_pending()
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения outbox: {e}", exc_info=True)
+            row = None
+
+        if row is None:
+            wait = poll_interval
+        else:
+            wait = row[6] - time.time()
+            if wait <= 0:
+                try:
+                    await _process(bot, row)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка обработки outbox #{row[0]}: {e}", exc_info=True)
+                    await asyncio.sleep(poll_interval)
+                continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
@@ -25,7 +25,9 @@ def can_access_command(user_id: int, command: str) -> bool:
         "/start": "view_basic",
         "/today_tomorrow": "view_bookings",
         "/room": "view_bookings",
+        "/guest": "view_bookings",
         "/spa": "view_bookings",
+        "/spa_free": "view_bookings",
         "/dop": "cash_operations",
         "/cash": "cash_operations",
         "/task": "tasks_manage",
@@ -35,6 +37,8 @@ def can_access_command(user_id: int, command: str) -> bool:
         "/send_cleaning_report": "send_cleaning_report",
         "/arrival": "arrival",
         "/arrival2": "arrival2", 
+        "/occupancy": "view_bookings",
+        "/today": "view_bookings",
         # Добавьте другие команды и соответствующие им разрешения
     }
 
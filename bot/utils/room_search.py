@@ -0,0 +1,117 @@
+# bot/utils/room_search.py
+import re
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Синонимы слов в названиях номеров: "домик 12" ищется как "дом 12"
+DEFAULT_SYNONYMS = {
+    "домик": "дом",
+    "дома": "дом",
+    "домике": "дом",
+    "номерок": "номер",
+    "коттеджик": "коттедж",
+    "spa": "спа",
+}
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text: str, synonyms: Dict[str, str] = DEFAULT_SYNONYMS) -> str:
+    """Нижний регистр, ё -> е, без пунктуации, синонимы заменены, пробелы схлопнуты."""
+    text = text.lower().replace("ё", "е")
+    tokens = _NON_WORD.sub(" ", text).split()
+    return " ".join(synonyms.get(token, token) for token in tokens)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RoomIndex:
+    """
+    Индекс названий номеров: точные названия, префиксы и триграммы.
+    Строится один раз при обновлении кэша, поиск не перебирает все номера.
+    """
+
+    # Сколько слов подряд проверять при поиске названий в произвольном тексте
+    MAX_NAME_TOKENS = 4
+
+    def __init__(self, rooms: Dict[str, str], synonyms: Dict[str, str] = DEFAULT_SYNONYMS):
+        """
+        :param rooms: {room_id: название номера}.
+        :param synonyms: Замены слов при нормализации.
+        """
+        self.synonyms = synonyms
+        self.names: Dict[str, str] = dict(rooms)
+        self.exact: Dict[str, str] = {}
+        self.prefix: Dict[str, Set[str]] = defaultdict(set)
+        self.trigram: Dict[str, Set[str]] = defaultdict(set)
+        self._normalized: Dict[str, str] = {}
+
+        for room_id, name in rooms.items():
+            norm = normalize(name, synonyms)
+            if not norm:
+                continue
+            self._normalized[room_id] = norm
+            self.exact.setdefault(norm, room_id)
+            for i in range(1, len(norm) + 1):
+                self.prefix[norm[:i]].add(room_id)
+            for gram in _trigrams(norm):
+                self.trigram[gram].add(room_id)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Ищет номера по названию.
+        :return: Список (room_id, название, оценка от 0 до 1), лучшие первыми.
+                 Точное совпадение — единственный результат с оценкой 1.0.
+        """
+        norm = normalize(query, self.synonyms)
+        if not norm:
+            return []
+        room_id = self.exact.get(norm)
+        if room_id:
+            return [(room_id, self.names[room_id], 1.0)]
+
+        # Совпадающие триграммы считаем только по кандидатам из индекса
+        query_grams = _trigrams(norm)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self.trigram.get(gram, ()):
+                shared[candidate] += 1
+
+        scores: Dict[str, float] = {}
+        for candidate, count in shared.items():
+            candidate_grams = len(self._normalized[candidate]) + 2
+            scores[candidate] = 2 * count / (len(query_grams) + candidate_grams)
+        # Начало названия совпадает с запросом — поднимаем в выдаче
+        for candidate in self.prefix.get(norm, ()):
+            scores[candidate] = max(scores.get(candidate, 0.0), 0.5) + 0.4
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.names[item[0]]))
+        return [
+            (candidate, self.names[candidate], min(score, 0.99))
+            for candidate, score in ranked[:limit]
+            if score >= 0.3
+        ]
+
+    def find_mentions(self, text: str) -> List[str]:
+        """
+        Находит названия номеров в произвольном тексте (например, расшифровке голоса).
+        Предпочитает самое длинное совпадение: в «дом 12 убран» найдётся «Дом 12», а не «Дом 1».
+        :return: room_id в порядке упоминания, без повторов.
+        """
+        tokens = normalize(text, self.synonyms).split()
+        found: List[str] = []
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.MAX_NAME_TOKENS, len(tokens) - i), 0, -1):
+                room_id = self.exact.get(" ".join(tokens[i:i + size]))
+                if room_id:
+                    if room_id not in found:
+                        found.append(room_id)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
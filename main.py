@@ -8,7 +8,10 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
 # Импорт настроек
-from bot.config import BOT_TOKEN
+from bot.config import (
+    BOT_TOKEN, METRICS_HOST, METRICS_PORT,
+    REFERENCE_REFRESH_INTERVAL, BOOKING_STORE_SYNC_INTERVAL, CASHBOX_REFRESH_INTERVAL,
+)
 from bot.rag.search import init_rag 
 
 # Импорт роутеров
@@ -18,9 +21,17 @@ from bot.handlers.finance import router as finance_router
 from bot.handlers.tasks import router as tasks_router
 from bot.handlers.voice import router as voice_router
 from bot.handlers.cleaning_report import router as cleaning_report_router
+from bot.handlers.digests import router as digests_router
 
 # Импорт и инициализация кэша
-from bot.cache import initialize_cache, periodic_cache_refresh
+from bot.cache import initialize_cache, refresh_cache, refresh_today_cashbox
+from bot.booking_store import sync_bookings
+from bot.scheduler import scheduler
+from bot.api.litepms import open_session, close_session
+from bot.utils.outbox import init_outbox, run_outbox_worker
+from bot.utils.digests import init_digests, run_due_digests
+from bot.booking_notifier import run_booking_notifier
+from bot.utils.metrics import start_metrics_server
 
 # Управление ИИ
 from bot.config import USE_LOCAL_AI
@@ -47,6 +58,9 @@ async def main():
     bot = Bot(token=BOT_TOKEN)
     dp = Dispatcher(storage=MemoryStorage())
 
+    # Пул соединений к Lite PMS
+    await open_session()
+
     # Инициализация глобального кэша
     logger.info("🔄 Инициализация глобального кэша...")
     try:
@@ -55,9 +69,30 @@ async def main():
     except Exception as e:
         logger.error(f"❌ Ошибка инициализации кэша: {e}")
 
-    # Запуск фоновой задачи обновления кэша
-    cache_refresh_task = asyncio.create_task(periodic_cache_refresh(3600))
-    logger.info("🚀 Задача периодического обновления кэша запущена.")
+    # Фоновые обновления: у каждого набора данных своя периодичность.
+    # Справочники только что загружены при инициализации — первый плановый запуск через интервал.
+    scheduler.add_job("reference", refresh_cache, REFERENCE_REFRESH_INTERVAL, first_delay=REFERENCE_REFRESH_INTERVAL)
+    scheduler.add_job("bookings", sync_bookings, BOOKING_STORE_SYNC_INTERVAL)
+    scheduler.add_job("cashbox_today", refresh_today_cashbox, CASHBOX_REFRESH_INTERVAL)
+    # Утренние рассылки: раз в минуту проверяем, не наступило ли время отправки
+    init_digests()
+    scheduler.add_job("digests", lambda: run_due_digests(bot), 60)
+    # Уведомления об изменениях бронирований после каждой синхронизации
+    notifier_task = asyncio.create_task(run_booking_notifier(bot))
+    scheduler.start()
+
+    # Очередь отложенной записи в Lite PMS: продолжает незавершённые записи после перезапуска
+    init_outbox()
+    outbox_task = asyncio.create_task(run_outbox_worker(bot))
+    logger.info("🚀 Обработчик очереди записи в Lite PMS запущен.")
+
+    # Эндпоинт метрик для Prometheus
+    metrics_runner = None
+    if METRICS_PORT:
+        try:
+            metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            logger.error(f"❌ Не удалось запустить эндпоинт метрик на {METRICS_HOST}:{METRICS_PORT}: {e}")
 
     # Подключение роутеров
     dp.include_router(base_router)
@@ -66,6 +101,7 @@ async def main():
     dp.include_router(tasks_router)
     dp.include_router(voice_router)
     dp.include_router(cleaning_report_router)
+    dp.include_router(digests_router)
     
     if AI_ROUTER_AVAILABLE:
         dp.include_router(ai_router)
@@ -77,13 +113,23 @@ async def main():
     try:
         await dp.start_polling(bot)
     finally:
-        # Отменяем фоновую задачу при завершении
-        logger.info("🛑 Отмена задачи обновления кэша...")
-        cache_refresh_task.cancel()
+        # Останавливаем фоновые обновления при завершении
+        logger.info("🛑 Остановка планировщика...")
+        await scheduler.stop()
+        logger.info("✅ Планировщик остановлен.")
+        notifier_task.cancel()
+        try:
+            await notifier_task
+        except asyncio.CancelledError:
+            logger.info("✅ Уведомления об изменениях бронирований остановлены.")
+        outbox_task.cancel()
         try:
-            await cache_refresh_task
+            await outbox_task
         except asyncio.CancelledError:
-            logger.info("✅ Задача обновления кэша отменена.")
+            logger.info("✅ Обработчик очереди записи остановлен.")
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await close_session()
         logger.info("🛑 Бот остановлен.")
         
  # Инициализация RAG
@@ -0,0 +1,42 @@
+# tests/test_json_stream.py
+import asyncio
+
+import pytest
+
+from bot.api.json_stream import ArrayNotFoundError, iter_json_array
+
+
+async def _chunks(text: str, size: int = 5):
+    data = text.encode("utf-8")
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _collect(text: str) -> list:
+    async def run():
+        return [item async for item in iter_json_array(_chunks(text), key="data")]
+    return asyncio.run(run())
+
+
+def test_yields_array_items():
+    assert _collect('{"status": "success", "data": [{"id": 1}, 2.5, "x"]}') == [{"id": 1}, 2.5, "x"]
+
+
+def test_empty_array_is_empty_list():
+    assert _collect('{"status": "success", "data": []}') == []
+
+
+@pytest.mark.parametrize("text", [
+    '{"status": "error", "data": "Неверный ключ"}',
+    '{"status": "error", "data": null}',
+    '{"status": "error"}',
+    '',
+])
+def test_missing_array_is_an_error(text):
+    with pytest.raises(ArrayNotFoundError):
+        _collect(text)
+
+
+def test_truncated_array_is_an_error():
+    with pytest.raises(ValueError):
+        _collect('{"data": [{"id": 1}, {"id"')
@@ -0,0 +1,55 @@
+# tests/test_resilience.py
+import asyncio
+import os
+
+import pytest
+
+from bot.api.resilience import CircuitBreaker
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    return breaker
+
+
+def test_half_open_allows_single_probe():
+    breaker = _half_open_breaker()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_next_request_through():
+    breaker = _half_open_breaker()
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_cancelled_probe_does_not_block_breaker(monkeypatch):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("dotenv")
+    for name in ("TELEGRAM_BOT_TOKEN", "LITEPMS_LOGIN", "LITEPMS_API_KEY"):
+        monkeypatch.setenv(name, os.environ.get(name, "test"))
+    from bot.api import litepms
+
+    breaker = _half_open_breaker()
+    monkeypatch.setattr(litepms, "_breaker", breaker)
+
+    async def slow_request_once(method, params, use_post):
+        await asyncio.sleep(10)
+        return {"status": "success", "data": []}, False
+
+    monkeypatch.setattr(litepms, "_request_once", slow_request_once)
+
+    async def run():
+        probe = asyncio.create_task(litepms._request("getRooms"))
+        await asyncio.sleep(0)
+        assert breaker.state == "half-open" and not breaker.allow()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(run())
+    assert breaker.allow()
@@ -0,0 +1,239 @@
+# tools/fake_litepms.py
+"""
+Локальный стенд Lite PMS для нагрузочного тестирования бота.
+
+Реализует методы, которые вызывает bot/api/litepms.py, на синтетических данных:
+getRooms, getCategories, searchBooking, getCashboxTransaction,
+addCashboxTransaction, setRoomCleaningStatus.
+
+Запуск:
+    python tools/fake_litepms.py --rooms 500 --bookings 100000 --latency-ms 300 --error-rate 0.02
+
+Бот направляется на стенд переменной окружения:
+    LITEPMS_BASE_URL=http://127.0.0.1:8081/api
+"""
+import argparse
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from aiohttp import web
+
+logger = logging.getLogger("fake_litepms")
+
+SURNAMES = ["Иванов", "Петрова", "Смирнов", "Кузнецова", "Попов", "Васильева", "Соколов", "Михайлова", "Новиков", "Фёдорова"]
+NAMES = ["Иван", "Анна", "Сергей", "Мария", "Алексей", "Елена", "Дмитрий", "Ольга", "Андрей", "Юлия"]
+ROOM_KINDS = ["Дом", "Номер", "Коттедж", "Шале", "Глэмпинг"]
+BOOKING_STATUSES = ["1", "2", "2", "2", "5", "6", "8"]
+COMMENTS = ["Баня", "Завтрак", "Прокат SUP", "Трансфер", "Ужин", "Поздний выезд"]
+
+
+class FakeData:
+    """Синтетические номера, категории, брони и кассовые операции."""
+
+    def __init__(self, rooms: int, bookings: int, days: int, spa_room_id: str, dopy_income_id: str, seed: int):
+        rnd = random.Random(seed)
+        self.categories: List[dict] = []
+        self.rooms: List[dict] = []
+        self.cashbox: Dict[str, List[dict]] = defaultdict(list)
+        self.bookings_by_checkin: Dict[str, List[dict]] = defaultdict(list)
+        self.cleaning: Dict[str, str] = {}
+        self._next_operation_id = 1
+
+        categories_count = max(1, rooms // 10)
+        for i in range(categories_count):
+            self.categories.append({"id": 100 + i, "name": f"{ROOM_KINDS[i % len(ROOM_KINDS)]} — категория {i + 1}"})
+
+        for i in range(rooms):
+            category = self.categories[i % categories_count]
+            kind = ROOM_KINDS[i % len(ROOM_KINDS)]
+            self.rooms.append({"id": 1000 + i, "name": f"{kind} {i + 1}", "cat_id": category["id"]})
+        self.rooms.append({"id": int(spa_room_id), "name": "СПА", "cat_id": self.categories[0]["id"]})
+
+        # Брони равномерно по окну [-days/2, +days/2] от сегодня
+        today = date.today()
+        start = today - timedelta(days=days // 2)
+        room_ids = [str(room["id"]) for room in self.rooms]
+        for i in range(bookings):
+            checkin = start + timedelta(days=rnd.randrange(days))
+            room_id = rnd.choice(room_ids)
+            if room_id == spa_room_id:
+                hour = rnd.randrange(10, 21)
+                date_in = datetime(checkin.year, checkin.month, checkin.day, hour)
+                date_out = date_in + timedelta(hours=rnd.choice([1, 2, 3]))
+            else:
+                date_in = datetime(checkin.year, checkin.month, checkin.day, 14)
+                date_out = date_in + timedelta(days=rnd.randint(1, 7), hours=-2)
+            booking = {
+                "id": str(500000 + i),
+                "room_id": room_id,
+                "status_id": rnd.choice(BOOKING_STATUSES),
+                "date_in": date_in.strftime("%Y-%m-%d %H:%M:%S"),
+                "date_out": date_out.strftime("%Y-%m-%d %H:%M:%S"),
+                "client_surname": rnd.choice(SURNAMES),
+                "client_name": rnd.choice(NAMES),
+                "person": str(rnd.randint(1, 4)),
+                "person_add": str(rnd.choice([0, 0, 0, 1])),
+            }
+            self.bookings_by_checkin[checkin.isoformat()].append(booking)
+
+            # Примерно на каждую пятую бронь — кассовая операция в день заезда
+            if rnd.random() < 0.2:
+                self._add_transaction(
+                    day=checkin.isoformat(),
+                    time=f"{rnd.randrange(8, 23):02d}:{rnd.randrange(60):02d}:00",
+                    price=rnd.choice([500, 1000, 1500, 3000, 5000]),
+                    comment=rnd.choice(COMMENTS),
+                    income_id=dopy_income_id if rnd.random() < 0.5 else "1",
+                )
+
+    def _add_transaction(self, day: str, time: str, price: float, comment: str, income_id: str) -> int:
+        operation_id = self._next_operation_id
+        self._next_operation_id += 1
+        self.cashbox[day].append({
+            "id": str(operation_id),
+            "date": f"{day} {time}",
+            "price": str(price),
+            "comment": comment,
+            "income": {"id": income_id},
+        })
+        return operation_id
+
+    @staticmethod
+    def _days(from_date: str, to_date: str) -> List[str]:
+        day = date.fromisoformat(from_date[:10])
+        end = date.fromisoformat(to_date[:10])
+        days = []
+        while day <= end:
+            days.append(day.isoformat())
+            day += timedelta(days=1)
+        return days
+
+    def search_checkins(self, from_date: str, to_date: str) -> List[dict]:
+        result = []
+        for day in self._days(from_date, to_date):
+            result.extend(self.bookings_by_checkin.get(day, ()))
+        return result
+
+    def cashbox_transactions(self, from_date: str, to_date: str) -> List[dict]:
+        result = []
+        for day in self._days(from_date, to_date):
+            result.extend(self.cashbox.get(day, ()))
+        return result
+
+    def add_transaction(self, params: dict) -> int:
+        now = datetime.now()
+        return self._add_transaction(
+            day=now.date().isoformat(),
+            time=now.strftime("%H:%M:%S"),
+            price=float(params.get("price", 0)),
+            comment=params.get("comment", ""),
+            income_id=params.get("income_id", ""),
+        )
+
+
+def build_app(data: FakeData, latency_ms: float, jitter_ms: float, error_rate: float, timeout_rate: float) -> web.Application:
+    """Собирает aiohttp-приложение с методами Lite PMS."""
+
+    async def _params(request: web.Request) -> dict:
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.post())
+        return params
+
+    async def _simulate_network():
+        """Задержка и внедрение ошибок перед каждым ответом."""
+        delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        roll = random.random()
+        if roll < timeout_rate:
+            # Имитация зависшего запроса: дольше любого разумного read timeout
+            await asyncio.sleep(120)
+        elif roll < timeout_rate + error_rate:
+            raise web.HTTPServiceUnavailable(text="Service temporarily unavailable")
+
+    def _success(payload) -> web.Response:
+        return web.json_response({"status": "success", "data": payload})
+
+    async def get_rooms(request: web.Request) -> web.Response:
+        await _simulate_network()
+        return _success(data.rooms)
+
+    async def get_categories(request: web.Request) -> web.Response:
+        await _simulate_network()
+        return _success(data.categories)
+
+    async def search_booking(request: web.Request) -> web.Response:
+        await _simulate_network()
+        params = await _params(request)
+        try:
+            bookings = data.search_checkins(params["from_date"], params["to_date"])
+        except (KeyError, ValueError):
+            return web.json_response({"status": "error", "data": "Неверные параметры from_date/to_date"})
+        return _success(bookings)
+
+    async def get_cashbox_transaction(request: web.Request) -> web.Response:
+        await _simulate_network()
+        params = await _params(request)
+        try:
+            transactions = data.cashbox_transactions(params["from_date"], params["to_date"])
+        except (KeyError, ValueError):
+            return web.json_response({"status": "error", "data": "Неверные параметры from_date/to_date"})
+        return _success(transactions)
+
+    async def add_cashbox_transaction(request: web.Request) -> web.Response:
+        await _simulate_network()
+        operation_id = data.add_transaction(await _params(request))
+        return web.json_response({"success": "true", "data": [{"operation_id": operation_id}]})
+
+    async def set_room_cleaning_status(request: web.Request) -> web.Response:
+        await _simulate_network()
+        params = await _params(request)
+        room_id = str(params.get("room_id", ""))
+        if not room_id:
+            return web.json_response({"success": "false", "data": "Не указан room_id"})
+        data.cleaning[room_id] = str(params.get("status_id", "0"))
+        return web.json_response({"success": "true", "data": {"room_id": room_id}})
+
+    app = web.Application()
+    for name, handler in [
+        ("getRooms", get_rooms),
+        ("getCategories", get_categories),
+        ("searchBooking", search_booking),
+        ("getCashboxTransaction", get_cashbox_transaction),
+        ("addCashboxTransaction", add_cashbox_transaction),
+        ("setRoomCleaningStatus", set_room_cleaning_status),
+    ]:
+        app.router.add_route("GET", f"/api/{name}", handler)
+        app.router.add_route("POST", f"/api/{name}", handler)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд Lite PMS с синтетическими данными")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rooms", type=int, default=50, help="Количество номеров (10–5000)")
+    parser.add_argument("--bookings", type=int, default=2000, help="Количество броней (до 100000 и больше)")
+    parser.add_argument("--days", type=int, default=120, help="Ширина окна броней в днях вокруг сегодняшней даты")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Средняя задержка ответа")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Разброс задержки")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов HTTP 503")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Доля зависающих запросов")
+    parser.add_argument("--spa-room-id", default="49518")
+    parser.add_argument("--dopy-income-id", default="9534")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    data = FakeData(args.rooms, args.bookings, args.days, args.spa_room_id, args.dopy_income_id, args.seed)
+    logger.info(f"Сгенерировано: {len(data.rooms)} номеров, {len(data.categories)} категорий, {args.bookings} броней.")
+    app = build_app(data, args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()